@@ -0,0 +1,160 @@
+"""
+Batch query mode for degrees.
+
+Loads the dataset once, then reads tab-separated source/target pairs (names
+or person ids) from a file or stdin and answers them across a process pool,
+writing one JSON object per query to stdout in input order.
+
+Where the platform supports fork, workers inherit the loaded graph from the
+parent process and share it read-only; with --compact or --snapshot the
+edge arrays live in flat buffers that stay shared instead of being copied
+as reference counts change. Elsewhere each worker loads the data itself.
+"""
+
+import argparse
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import degrees
+
+# Search function used by the workers, set by initialize()
+search = degrees.shortest_path
+
+
+def initialize(directory, compact, use_snapshot, bidirectional, cache_size,
+               limits):
+    """
+    Prepares a worker process, loading the data and building the name
+    index unless they were inherited. `limits` holds the max_cast,
+    max_fanout and max_degrees options of shortest_path.
+    """
+    global search
+
+    if not degrees.people:
+        degrees.load_data(directory, compact=compact,
+                          use_snapshot=use_snapshot)
+    # Built up front so suggestions for unknown names never sort every
+    # name while answering a query
+    degrees._name_index()
+    if cache_size:
+        degrees.tree_cache.maxsize = cache_size
+        search = degrees.cached_shortest_path
+    elif bidirectional:
+        search = degrees.bidirectional_shortest_path
+    else:
+        search = functools.partial(degrees.shortest_path, **limits)
+
+
+def resolve(query):
+    """
+    Returns the person_id for a person id or an unambiguous name.
+    """
+    if query in degrees.people:
+        return query
+    person_ids = degrees.names.get(query.lower(), set())
+    if len(person_ids) == 0:
+        suggestions = ", ".join(
+            candidate[1] for candidate in degrees.candidates_for_name(query, 3)
+        )
+        if suggestions:
+            raise LookupError(
+                f"person not found: {query} (did you mean: {suggestions}?)"
+            )
+        raise LookupError(f"person not found: {query}")
+    if len(person_ids) > 1:
+        raise LookupError(f"ambiguous name: {query}")
+    return next(iter(person_ids))
+
+
+def answer(line):
+    """
+    Answers one "source<TAB>target" query line, returning a JSON-ready dict
+    with the path and the query latency in milliseconds.
+    """
+    hits = degrees.tree_cache.hits
+    start = time.perf_counter()
+    result = {}
+    try:
+        fields = line.rstrip("\r\n").split("\t")
+        if len(fields) != 2:
+            raise ValueError("expected source<TAB>target")
+        source, target = fields
+        result["source"] = source
+        result["target"] = target
+        path = search(resolve(source), resolve(target))
+        result["degrees"] = None if path is None else len(path)
+        result["path"] = path
+        if search is degrees.cached_shortest_path:
+            result["cache_hit"] = degrees.tree_cache.hits > hits
+    except (ValueError, LookupError) as e:
+        result["error"] = str(e)
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("queries", nargs="?", default="-",
+                        help="file of source<TAB>target lines, - for stdin")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=16,
+                        help="queries handed to a worker at a time")
+    parser.add_argument("--compact", action="store_true",
+                        help="store star edges as integer CSR arrays")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="load from a binary snapshot of the CSV files")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both people until the paths meet")
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="search trees per worker to keep for reuse")
+    parser.add_argument("--max-cast", type=int,
+                        help="skip movies with more stars than this")
+    parser.add_argument("--max-fanout", type=int,
+                        help="expand at most this many stars per movie")
+    parser.add_argument("--max-degrees", type=int,
+                        help="give up on paths longer than this")
+    args = parser.parse_args()
+
+    # Only shortest_path takes limits, and only one search mode applies
+    bounded = [option for option, value in (
+        ("--max-cast", args.max_cast),
+        ("--max-fanout", args.max_fanout),
+        ("--max-degrees", args.max_degrees),
+    ) if value is not None]
+    if args.cache_size and args.bidirectional:
+        parser.error("--cache-size cannot be combined with --bidirectional")
+    for mode, enabled in (("--cache-size", args.cache_size),
+                          ("--bidirectional", args.bidirectional)):
+        if enabled and bounded:
+            parser.error(f"{bounded[0]} cannot be combined with {mode}")
+
+    limits = {
+        "max_cast": args.max_cast,
+        "max_fanout": args.max_fanout,
+        "max_degrees": args.max_degrees,
+    }
+    options = (args.directory, args.compact, args.snapshot,
+               args.bidirectional, args.cache_size, limits)
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        initialize(*options)
+    else:
+        context = multiprocessing.get_context()
+
+    queries = sys.stdin if args.queries == "-" else open(
+        args.queries, encoding="utf-8"
+    )
+    with queries, context.Pool(args.workers, initialize, options) as pool:
+        lines = (line for line in queries if line.strip())
+        for result in pool.imap(answer, lines, args.chunksize):
+            print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
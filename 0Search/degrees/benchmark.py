@@ -0,0 +1,243 @@
+"""
+Reproducible benchmarks for degrees over synthetic datasets.
+
+Generates people.csv, movies.csv and stars.csv with a controllable size and
+degree distribution, then times loading, neighbor expansion and path search
+for each storage mode and frontier implementation. Results are written as
+one JSON document.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import degrees
+from util import QueueFrontier, HashedQueueFrontier
+
+
+def generate(directory, people=10000, movies=5000, cast=6,
+             distribution="powerlaw", seed=0):
+    """
+    Writes a synthetic dataset to `directory`.
+
+    Each movie gets a cast of about `cast` people on average. With
+    "uniform", cast sizes are uniform and every person is equally likely to
+    be cast; with "powerlaw", cast sizes follow a Pareto distribution and
+    people are cast with Zipf-distributed popularity, giving the few
+    high-degree hubs of real film data.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(people):
+            writer.writerow([i, f"Person {i}", 1900 + rng.randrange(110)])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(movies):
+            writer.writerow([i, f"Movie {i}", 1920 + rng.randrange(100)])
+
+    if distribution == "powerlaw":
+        weights = itertools.accumulate(
+            1 / (rank + 1) for rank in range(people)
+        )
+        popularity = list(weights)
+    elif distribution == "uniform":
+        popularity = None
+    else:
+        raise ValueError(f"unknown distribution: {distribution}")
+
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(movies):
+            if popularity is None:
+                size = rng.randint(1, 2 * cast - 1)
+                chosen = rng.sample(range(people), min(size, people))
+            else:
+                # Pareto with shape 2 has mean 2, so halve to average `cast`
+                size = int(cast / 2 * rng.paretovariate(2))
+                chosen = set(rng.choices(range(people),
+                                         cum_weights=popularity,
+                                         k=min(max(size, 1), people)))
+            for person in chosen:
+                writer.writerow([person, movie])
+
+
+def reset():
+    """
+    Clears the data held by degrees so it can be loaded again.
+    """
+    degrees.names.clear()
+    degrees.people.clear()
+    degrees.movies.clear()
+
+
+def load(directory, options):
+    """
+    Loads the dataset with load_data options, returning (seconds, peak
+    memory). Run in a fresh process, the peak is that of this load alone.
+    """
+    return tuple(degrees.load_data(directory, **options))
+
+
+def timed(name, function, repeat=1, **config):
+    """
+    Runs `function` `repeat` times and returns a result record.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    seconds = time.perf_counter() - start
+    return {
+        "name": name,
+        **config,
+        "repeat": repeat,
+        "seconds": round(seconds, 6),
+        "per_op_ms": round(seconds / repeat * 1000, 6),
+    }
+
+
+def run(directory, queries=50, seed=0, list_frontier=False):
+    """
+    Benchmarks load, neighbor expansion and search over the dataset in
+    `directory`, returning a list of result records. The list-backed
+    QueueFrontier is quadratic, so it is only timed with `list_frontier`.
+    """
+    results = []
+    snapshot = os.path.join(directory, degrees.SNAPSHOT_FILE)
+    if os.path.exists(snapshot):
+        os.remove(snapshot)
+
+    loads = [
+        ("dict", {}),
+        ("compact", {"compact": True}),
+        ("snapshot-build", {"use_snapshot": True}),
+        ("snapshot", {"use_snapshot": True}),
+    ]
+    # The peak memory load_data reports is the process's lifetime peak, so
+    # each mode loads in a new interpreter of its own
+    context = multiprocessing.get_context("spawn")
+    for mode, options in loads:
+        with context.Pool(1) as pool:
+            seconds, peak_memory = pool.apply(load, (directory, options))
+        results.append({
+            "name": "load",
+            "mode": mode,
+            "seconds": round(seconds, 6),
+            "peak_memory": peak_memory,
+        })
+
+    for mode, options in loads[:2]:
+        reset()
+        degrees.load_data(directory, **options)
+        rng = random.Random(seed)
+        person_ids = list(degrees.people)
+        sample = rng.sample(person_ids, min(queries * 10, len(person_ids)))
+        pairs = [(rng.choice(person_ids), rng.choice(person_ids))
+                 for _ in range(queries)]
+        # Repeated queries from a few sources, as seen by the tree cache
+        hub_pairs = [(rng.choice(sample[:5]), target) for _, target in pairs]
+        persons = itertools.cycle(sample)
+        pairs_cycle = itertools.cycle(pairs)
+        hub_pairs_cycle = itertools.cycle(hub_pairs)
+
+        results.append(timed(
+            "neighbors_for_person",
+            lambda: degrees.neighbors_for_person(next(persons)),
+            repeat=len(sample), mode=mode
+        ))
+
+        frontiers = [HashedQueueFrontier]
+        if list_frontier:
+            frontiers.append(QueueFrontier)
+        for frontier in frontiers:
+            results.append(timed(
+                "shortest_path",
+                lambda: degrees.shortest_path(*next(pairs_cycle),
+                                              frontier=frontier),
+                repeat=len(pairs), mode=mode, frontier=frontier.__name__
+            ))
+        results.append(timed(
+            "bidirectional_shortest_path",
+            lambda: degrees.bidirectional_shortest_path(*next(pairs_cycle)),
+            repeat=len(pairs), mode=mode
+        ))
+        for name, search in [
+            ("shortest_path", degrees.shortest_path),
+            ("cached_shortest_path", degrees.cached_shortest_path),
+        ]:
+            results.append(timed(
+                name,
+                lambda: search(*next(hub_pairs_cycle)),
+                repeat=len(hub_pairs), mode=mode, sources=5
+            ))
+
+    os.remove(snapshot)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--people", type=int, default=10000)
+    parser.add_argument("--movies", type=int, default=5000)
+    parser.add_argument("--cast", type=int, default=6,
+                        help="average number of people per movie")
+    parser.add_argument("--distribution", default="powerlaw",
+                        choices=["powerlaw", "uniform"])
+    parser.add_argument("--queries", type=int, default=50,
+                        help="number of random person pairs to search")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--directory",
+                        help="keep the generated dataset in this directory")
+    parser.add_argument("--list-frontier", action="store_true",
+                        help="also time the list-backed QueueFrontier")
+    parser.add_argument("--output", help="write results to this file")
+    args = parser.parse_args()
+
+    config = {
+        "people": args.people,
+        "movies": args.movies,
+        "cast": args.cast,
+        "distribution": args.distribution,
+        "queries": args.queries,
+        "seed": args.seed,
+    }
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = args.directory or temporary
+        generate(directory, args.people, args.movies, args.cast,
+                 args.distribution, args.seed)
+        results = run(directory, args.queries, args.seed,
+                      args.list_frontier)
+
+    report = {
+        "config": config,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
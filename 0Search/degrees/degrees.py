@@ -1,7 +1,23 @@
+import argparse
 import csv
+import os
 import sys
+import time
+from array import array
+from collections import namedtuple
+from itertools import islice
+from operator import itemgetter
+from sys import intern
 
-from util import Node, StackFrontier, QueueFrontier
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import snapshot
+from graph import CompactGraph
+from nameindex import NameIndex
+from util import Node, HashedQueueFrontier, TreeCache
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,55 +28,343 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# CompactGraph holding the star edges when loaded in compact mode, in which
+# case people and movies carry no "movies"/"stars" sets
+graph = None
+
+# NameIndex over the keys of names, built on first use
+name_index = None
+
+# Complete breadth-first parent trees keyed by source person_id
+tree_cache = TreeCache()
+
+# File name of the binary snapshot kept next to the CSV files
+SNAPSHOT_FILE = "degrees.snapshot"
+
+# Seconds spent in load_data and peak process memory in bytes afterwards
+LoadStats = namedtuple("LoadStats", ["seconds", "peak_memory"])
+
+# Number of people, movies and star edges newly added by load_delta
+DeltaStats = namedtuple("DeltaStats", ["people", "movies", "stars"])
 
-def load_data(directory):
+
+def load_data(directory, compact=False, use_snapshot=False, minimal=False):
     """
-    Load data from CSV files into memory.
+    Load data from CSV files into memory, returning LoadStats with the load
+    time and the peak memory of the process.
+
+    With `compact`, star edges are stored in an integer-indexed CompactGraph
+    instead of per-person and per-movie sets. With `use_snapshot`, the data
+    is loaded in compact mode from a memory-mapped binary snapshot, which is
+    (re)built from the CSV files whenever it is missing or stale. With
+    `minimal`, only the columns needed to look up names and print paths are
+    read, and every birth and year is None.
     """
+    global name_index
+
+    start = time.perf_counter()
+    tree_cache.clear()
+    name_index = None
+    if use_snapshot:
+        _load_snapshot(directory)
+    else:
+        _load_csv(directory, compact, minimal)
+    return LoadStats(time.perf_counter() - start, _peak_memory())
+
+
+def _load_csv(directory, compact, minimal):
+    """
+    Streams the CSV files into people, movies, names and the star edges.
+    """
+    global graph
+
     # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+    if minimal:
+        rows = _read_csv(f"{directory}/people.csv", "id", "name")
+    else:
+        rows = _read_csv(f"{directory}/people.csv", "id", "name", "birth")
+    for row in rows:
+        person_id = intern(row[0])
+        name = row[1]
+        people[person_id] = {
+            "name": name,
+            "birth": None if minimal else intern(row[2])
+        }
+        if not compact:
+            people[person_id]["movies"] = set()
+        if name.lower() not in names:
+            names[name.lower()] = {person_id}
+        else:
+            names[name.lower()].add(person_id)
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
+    if minimal:
+        rows = _read_csv(f"{directory}/movies.csv", "id", "title")
+    else:
+        rows = _read_csv(f"{directory}/movies.csv", "id", "title", "year")
+    for row in rows:
+        movie_id = intern(row[0])
+        movies[movie_id] = {
+            "title": row[1],
+            "year": None if minimal else intern(row[2])
+        }
+        if not compact:
+            movies[movie_id]["stars"] = set()
+
+    if compact:
+        graph = _load_compact_stars(directory)
+        return
+    graph = None
+
+    # Load stars, storing the id strings already held as keys
+    for person_id, movie_id in _read_csv(f"{directory}/stars.csv",
+                                         "person_id", "movie_id"):
+        person = people.get(person_id)
+        movie = movies.get(movie_id)
+        if person is not None and movie is not None:
+            person["movies"].add(intern(movie_id))
+            movie["stars"].add(intern(person_id))
+
+
+def _read_csv(path, *columns):
+    """
+    Yields a tuple of the requested columns for each row of a CSV file,
+    without building a dict per row.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        fields = itemgetter(*[header.index(column) for column in columns])
+        if len(columns) == 1:
+            for row in reader:
+                yield (fields(row),)
+        else:
+            for row in reader:
+                yield fields(row)
+
+
+def _peak_memory():
+    """
+    Returns the peak resident memory of the process in bytes, or None where
+    the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _load_snapshot(directory):
+    """
+    Loads people, movies and the CompactGraph from the directory's snapshot,
+    compiling the snapshot from the CSV files first if needed.
+    """
+    global graph
+
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    sources = [os.path.join(directory, f"{name}.csv")
+               for name in ("people", "movies", "stars")]
+    data = snapshot.read_snapshot(path, sources)
+    if data is None:
+        load_data(directory, compact=True)
+        snapshot.write_snapshot(path, sources, people, movies, graph)
+        return
+
+    for person_id, name, birth in zip(data.person_ids, data.names,
+                                      data.births):
+        people[person_id] = {"name": name, "birth": birth}
+        if name.lower() not in names:
+            names[name.lower()] = {person_id}
+        else:
+            names[name.lower()].add(person_id)
+    for movie_id, title, year in zip(data.movie_ids, data.titles, data.years):
+        movies[movie_id] = {"title": title, "year": year}
+    graph = data.graph
+
+
+def _load_compact_stars(directory):
+    """
+    Reads stars.csv into a CompactGraph over the loaded people and movies.
+    """
+    person_ids = list(people)
+    movie_ids = list(movies)
+    person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+    movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+    edge_people = array("i")
+    edge_movies = array("i")
+    for person_id, movie_id in _read_csv(f"{directory}/stars.csv",
+                                         "person_id", "movie_id"):
+        person = person_index.get(person_id)
+        movie = movie_index.get(movie_id)
+        if person is not None and movie is not None:
+            edge_people.append(person)
+            edge_movies.append(movie)
+
+    # The graph keeps these maps rather than building its own copies
+    return CompactGraph.from_edges(person_ids, movie_ids,
+                                   edge_people, edge_movies,
+                                   person_index, movie_index)
+
+
+def add_person(person_id, name, birth):
+    """
+    Adds a person to the loaded data. Existing people are left unchanged.
+    Returns True if the person was added.
+    """
+    person_id = intern(person_id)
+    if person_id in people:
+        return False
+    people[person_id] = {"name": name, "birth": birth}
+    if graph is None:
+        people[person_id]["movies"] = set()
+    else:
+        graph.add_person(person_id)
+    if name.lower() not in names:
+        names[name.lower()] = {person_id}
+    else:
+        names[name.lower()].add(person_id)
+    if name_index is not None:
+        name_index.add(name.lower())
+    return True
+
+
+def add_movie(movie_id, title, year):
+    """
+    Adds a movie to the loaded data. Existing movies are left unchanged.
+    Returns True if the movie was added.
+    """
+    movie_id = intern(movie_id)
+    if movie_id in movies:
+        return False
+    movies[movie_id] = {"title": title, "year": year}
+    if graph is None:
+        movies[movie_id]["stars"] = set()
+    else:
+        graph.add_movie(movie_id)
+    return True
+
+
+def add_star(person_id, movie_id):
+    """
+    Records that a loaded person starred in a loaded movie, evicting only
+    the cached search trees the new edge can change. Returns True if the
+    edge was added, and raises KeyError for an unknown person or movie.
+    """
+    if person_id not in people or movie_id not in movies:
+        raise KeyError((person_id, movie_id))
+
+    # Everyone the new edge connects, as search states
+    if graph is None:
+        if movie_id in people[person_id]["movies"]:
+            return False
+        connected = movies[movie_id]["stars"] | {person_id}
+    else:
+        person = graph.person_index[person_id]
+        movie = graph.movie_index[movie_id]
+        if movie in graph.movies_for(person):
+            return False
+        connected = set(graph.stars_for(movie))
+        connected.add(person)
+
+    _invalidate_trees(connected)
+
+    if graph is None:
+        people[person_id]["movies"].add(intern(movie_id))
+        movies[movie_id]["stars"].add(intern(person_id))
+    else:
+        graph.add_edge(person, movie)
+    return True
+
+
+def load_delta(directory):
+    """
+    Adds the rows of whichever of people.csv, movies.csv and stars.csv exist
+    in `directory` to the loaded data, skipping stars for unknown people or
+    movies. Returns DeltaStats with the number of new rows of each kind.
+    """
+    added = {"people": 0, "movies": 0, "stars": 0}
+
+    path = os.path.join(directory, "people.csv")
+    if os.path.exists(path):
+        for person_id, name, birth in _read_csv(path, "id", "name", "birth"):
+            added["people"] += add_person(person_id, name, intern(birth))
+
+    path = os.path.join(directory, "movies.csv")
+    if os.path.exists(path):
+        for movie_id, title, year in _read_csv(path, "id", "title", "year"):
+            added["movies"] += add_movie(movie_id, title, intern(year))
+
+    path = os.path.join(directory, "stars.csv")
+    if os.path.exists(path):
+        for person_id, movie_id in _read_csv(path, "person_id", "movie_id"):
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                added["stars"] += add_star(person_id, movie_id)
             except KeyError:
                 pass
 
+    return DeltaStats(**added)
+
+
+def _invalidate_trees(connected):
+    """
+    Evicts the cached search trees that a new edge between every pair of
+    the `connected` states could change.
+
+    A tree reaching none of them lies in another component, and a tree
+    whose depths for them differ by at most one still holds shortest
+    paths, so both are kept.
+    """
+    for source, tree in list(tree_cache.trees.items()):
+        depths = [_tree_depth(tree, state)
+                  for state in connected if state in tree]
+        if not depths:
+            continue
+        if len(depths) < len(connected) or max(depths) - min(depths) > 1:
+            del tree_cache.trees[source]
+
+
+def _tree_depth(tree, state):
+    """
+    Returns the number of steps from the root of a search tree to a state.
+    """
+    depth = 0
+    while tree[state] is not None:
+        state = tree[state][1]
+        depth += 1
+    return depth
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true",
+                        help="store star edges as integer CSR arrays")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="load from a binary snapshot of the CSV files")
+    parser.add_argument("--minimal", action="store_true",
+                        help="skip the birth and year columns")
+    parser.add_argument("--delta", action="append", default=[],
+                        metavar="DIRECTORY",
+                        help="also add the rows of a delta CSV directory")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both people until the paths meet")
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    stats = load_data(args.directory, compact=args.compact,
+                      use_snapshot=args.snapshot, minimal=args.minimal)
+    if stats.peak_memory is None:
+        print(f"Data loaded in {stats.seconds:.2f}s.")
+    else:
+        print(f"Data loaded in {stats.seconds:.2f}s "
+              f"(peak memory {stats.peak_memory / 2 ** 20:.0f} MiB).")
+    for delta in args.delta:
+        added = load_delta(delta)
+        print(f"Added {added.people} people, {added.movies} movies and "
+              f"{added.stars} stars from {delta}.")
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -69,7 +373,10 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    if args.bidirectional:
+        path = bidirectional_shortest_path(source, target)
+    else:
+        path = shortest_path(source, target)
 
     if path is None:
         print("Not connected.")
@@ -84,16 +391,44 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, frontier=HashedQueueFrontier,
+                  max_cast=None, max_fanout=None, max_degrees=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
-    that connect the source to the target.
+    that connect the source to the target, searching with the given
+    breadth-first frontier class.
+
+    `max_cast` and `max_fanout` bound the cost of huge-cast movies by
+    skipping movies with more stars than `max_cast` and expanding at most
+    `max_fanout` co-stars per movie. The path found that way can be longer
+    than the shortest one, and if none is found the search is repeated
+    without pruning. With `max_degrees`, the search stops after that many
+    steps.
 
     If no possible path, returns None.
     """
-    frontier = QueueFrontier()
-    initialState = source
-    goalState = target
+    initialState = _state(source)
+    goalState = _state(target)
+    path = _shortest_path(initialState, goalState, frontier,
+                          lambda state: _neighbors(state, max_cast,
+                                                   max_fanout),
+                          max_degrees)
+    if path is None and (max_cast is not None or max_fanout is not None):
+        path = _shortest_path(initialState, goalState, frontier,
+                              _neighbors, max_degrees)
+    return _path_ids(path)
+
+
+def _shortest_path(initialState, goalState, frontier_class,
+                   expand=None, max_degrees=None):
+    """
+    Breadth-first search between two search states, expanding them with
+    `expand` (by default _neighbors) up to `max_degrees` steps, returning a
+    list of (action, state) pairs or None.
+    """
+    if expand is None:
+        expand = _neighbors
+    frontier = frontier_class()
     currentNode = Node(initialState, None, None)
     frontier.add(currentNode)
     
@@ -101,8 +436,10 @@ def shortest_path(source, target):
         if frontier.empty():
             return None
         currentNode = frontier.remove()
+        if max_degrees is not None and currentNode.depth >= max_degrees:
+            return None
         
-        neighbourNodes = neighbors_for_person(currentNode.state)
+        neighbourNodes = expand(currentNode.state)
         for neighbourNode in neighbourNodes:
             if neighbourNode[1] == goalState:
                 currentNode = Node(neighbourNode[1], currentNode, neighbourNode[0])
@@ -118,6 +455,293 @@ def shortest_path(source, target):
         currentNode = currentNode.parent
     return path[::-1]
 
+
+def cached_shortest_path(source, target):
+    """
+    Returns a shortest list of (movie_id, person_id) pairs that connect the
+    source to the target by walking the parent pointers of a complete
+    breadth-first tree from the source, kept in the LRU `tree_cache`.
+
+    If no possible path, returns None.
+    """
+    tree = tree_cache.get(source)
+    if tree is None:
+        tree = _search_tree(_state(source))
+        tree_cache.put(source, tree)
+
+    state = _state(target)
+    if state not in tree:
+        return None
+    path = []
+    while tree[state] is not None:
+        action, parent = tree[state]
+        path.append((action, state))
+        state = parent
+    return _path_ids(path[::-1])
+
+
+def cache_info():
+    """
+    Returns the hits, misses, maxsize and currsize of `tree_cache`.
+    """
+    return tree_cache.info()
+
+
+def _search_tree(initialState):
+    """
+    Breadth-first search over every state reachable from `initialState`,
+    returning a dict mapping each state to its (action, parent state), or
+    None for the root.
+    """
+    tree = {initialState: None}
+    layer = [initialState]
+    while layer:
+        nextLayer = []
+        for state in layer:
+            for action, neighbour in _neighbors(state):
+                if neighbour not in tree:
+                    tree[neighbour] = (action, state)
+                    nextLayer.append(neighbour)
+        layer = nextLayer
+    return tree
+
+
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the same shortest list of (movie_id, person_id) pairs as
+    shortest_path, growing breadth-first frontiers from both the source and
+    the target until they meet.
+
+    If no possible path, returns None.
+    """
+    return _path_ids(_bidirectional_path(_state(source), _state(target)))
+
+
+def _bidirectional_path(initialState, goalState):
+    """
+    Bidirectional breadth-first search between two search states, returning
+    a list of (action, state) pairs or None.
+    """
+    if initialState == goalState:
+        return []
+
+    # Map reached states to (action, state one step closer to the root, depth)
+    forward = {initialState: (None, None, 0)}
+    backward = {goalState: (None, None, 0)}
+    forwardLayer = [initialState]
+    backwardLayer = [goalState]
+
+    meeting = None
+    while meeting is None:
+        if not forwardLayer or not backwardLayer:
+            return None
+        # Always grow the smaller side by one complete layer
+        if len(forwardLayer) <= len(backwardLayer):
+            forwardLayer, meeting = _expand_layer(
+                forwardLayer, forward, backward
+            )
+        else:
+            backwardLayer, meeting = _expand_layer(
+                backwardLayer, backward, forward
+            )
+
+    path = []
+    state = meeting
+    while state != initialState:
+        action, parent, _ = forward[state]
+        path.append((action, state))
+        state = parent
+    path.reverse()
+
+    state = meeting
+    while state != goalState:
+        action, child, _ = backward[state]
+        path.append((action, child))
+        state = child
+    return path
+
+
+def _expand_layer(layer, reached, opposite):
+    """
+    Expands every state in a breadth-first layer, recording new states in
+    `reached`. Returns the next layer and the state joining the two searches
+    with the shortest total path, or None if the searches have not met.
+    """
+    nextLayer = []
+    meeting = None
+    best = None
+    for state in layer:
+        depth = reached[state][2] + 1
+        for action, neighbour in _neighbors(state):
+            if neighbour in reached:
+                continue
+            reached[neighbour] = (action, state, depth)
+            nextLayer.append(neighbour)
+            if neighbour in opposite:
+                length = depth + opposite[neighbour][2]
+                if best is None or length < best:
+                    best = length
+                    meeting = neighbour
+    return nextLayer, meeting
+
+
+def all_shortest_paths(source, target):
+    """
+    Lazily yields every shortest list of (movie_id, person_id) pairs that
+    connect the source to the target.
+
+    Yields nothing if there is no possible path.
+    """
+    initialState = _state(source)
+    predecessors = _shortest_path_layers(initialState, _state(target))
+    if predecessors is None:
+        return
+    for path in _layered_paths(predecessors, initialState, _state(target)):
+        yield _path_ids(path)
+
+
+def connections(source, target, max_degrees=None):
+    """
+    Lazily yields every list of (movie_id, person_id) pairs that connect the
+    source to the target without visiting a person twice, shortest first,
+    using at most `max_degrees` steps if given.
+    """
+    initialState = _state(source)
+    goalState = _state(target)
+    distances = _search_distances(goalState, max_degrees)
+    if initialState not in distances:
+        return
+
+    longest = len(distances) - 1 if max_degrees is None else max_degrees
+    for length in range(distances[initialState], longest + 1):
+        for path in _paths_of_length(initialState, goalState, length,
+                                     distances):
+            yield _path_ids(path)
+
+
+def k_shortest_paths(source, target, k, max_degrees=None):
+    """
+    Returns up to `k` lists of (movie_id, person_id) pairs that connect the
+    source to the target, shortest first.
+    """
+    return list(islice(connections(source, target, max_degrees), k))
+
+
+def _shortest_path_layers(initialState, goalState):
+    """
+    Breadth-first search that stops after the layer containing `goalState`,
+    returning a dict mapping each reached state to every (action, parent)
+    pair one layer closer to `initialState`, or None if there is no path.
+    """
+    predecessors = {initialState: []}
+    layer = [initialState]
+    while goalState not in predecessors:
+        if not layer:
+            return None
+        nextLayer = {}
+        for state in layer:
+            for action, neighbour in _neighbors(state):
+                if neighbour in predecessors:
+                    continue
+                if neighbour not in nextLayer:
+                    nextLayer[neighbour] = []
+                nextLayer[neighbour].append((action, state))
+        predecessors.update(nextLayer)
+        layer = list(nextLayer)
+    return predecessors
+
+
+def _layered_paths(predecessors, initialState, state):
+    """
+    Lazily yields every path from `initialState` to `state` through the
+    layered predecessors of _shortest_path_layers.
+    """
+    if state == initialState:
+        yield []
+        return
+    for action, parent in predecessors[state]:
+        for path in _layered_paths(predecessors, initialState, parent):
+            path.append((action, state))
+            yield path
+
+
+def _search_distances(initialState, limit=None):
+    """
+    Returns a dict mapping every state within `limit` steps of
+    `initialState` to its breadth-first distance.
+    """
+    distances = {initialState: 0}
+    layer = [initialState]
+    depth = 0
+    while layer and (limit is None or depth < limit):
+        depth += 1
+        nextLayer = []
+        for state in layer:
+            for _, neighbour in _neighbors(state):
+                if neighbour not in distances:
+                    distances[neighbour] = depth
+                    nextLayer.append(neighbour)
+        layer = nextLayer
+    return distances
+
+
+def _paths_of_length(initialState, goalState, length, distances):
+    """
+    Lazily yields every path of exactly `length` steps from `initialState`
+    to `goalState` visiting no state twice, pruning states that are too far
+    from the goal by `distances`.
+    """
+    path = []
+    visited = {initialState}
+
+    def extend(state):
+        if state == goalState:
+            if len(path) == length:
+                yield list(path)
+            return
+        remaining = length - len(path) - 1
+        for action, neighbour in _neighbors(state):
+            if (neighbour in visited
+                    or distances.get(neighbour, remaining + 1) > remaining):
+                continue
+            visited.add(neighbour)
+            path.append((action, neighbour))
+            yield from extend(neighbour)
+            path.pop()
+            visited.discard(neighbour)
+
+    yield from extend(initialState)
+
+
+def _state(person_id):
+    """
+    Returns the search state for a person_id: the id itself, or its integer
+    index when a CompactGraph is loaded.
+    """
+    if graph is None:
+        return person_id
+    return graph.person_index[person_id]
+
+
+def _neighbors(state, max_cast=None, max_fanout=None):
+    """
+    Returns (action, state) pairs reachable from a search state.
+    """
+    if graph is None:
+        return neighbors_for_person(state, max_cast, max_fanout)
+    return graph.neighbors(state, max_cast, max_fanout)
+
+
+def _path_ids(path):
+    """
+    Translates a path of (action, state) pairs into (movie_id, person_id)
+    pairs.
+    """
+    if graph is None:
+        return path
+    return graph.path_ids(path)
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
@@ -144,16 +768,63 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
-def neighbors_for_person(person_id):
+def candidates_for_name(name, limit=10, max_distance=2):
+    """
+    Returns up to `limit` (person_id, name, birth, distance) candidates for
+    a possibly misspelled name without prompting, ranked by edit distance.
+    """
+    candidates = []
+    for distance, match in _name_index().search(name.lower(), max_distance,
+                                                limit):
+        for person_id in sorted(names[match]):
+            person = people[person_id]
+            candidates.append(
+                (person_id, person["name"], person["birth"], distance)
+            )
+    return candidates[:limit]
+
+
+def complete_name(prefix, limit=10):
+    """
+    Returns up to `limit` distinct lower-cased names starting with `prefix`.
+    """
+    return _name_index().complete(prefix.lower(), limit)
+
+
+def _name_index():
+    """
+    Returns the NameIndex over names, building it on first use.
+    """
+    global name_index
+
+    if name_index is None:
+        name_index = NameIndex(names)
+    return name_index
+
+
+def neighbors_for_person(person_id, max_cast=None, max_fanout=None):
     """
     Returns (movie_id, person_id) pairs for people
-    who starred with a given person.
+    who starred with a given person, skipping movies with more than
+    `max_cast` stars and taking at most `max_fanout` stars per movie.
+    The person itself does not count towards `max_fanout`, and the stars
+    taken are those with the smallest ids, so pruned searches repeat.
     """
+    if graph is not None:
+        person = graph.person_index[person_id]
+        return set(graph.path_ids(
+            graph.neighbors(person, max_cast, max_fanout)
+        ))
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+        stars = movies[movie_id]["stars"]
+        if max_cast is not None and len(stars) > max_cast:
+            continue
+        if max_fanout is not None:
+            stars = sorted(stars - {person_id})[:max_fanout]
+        for star_id in stars:
+            neighbors.add((movie_id, star_id))
     return neighbors
 
 
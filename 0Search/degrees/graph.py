@@ -0,0 +1,224 @@
+"""
+Compact, integer-indexed adjacency for the degrees dataset.
+"""
+
+from array import array
+
+
+class CompactGraph():
+    """
+    Person <-> movie bipartite graph stored as CSR (compressed sparse row)
+    arrays over dense integer indices.
+
+    `person_offsets[p]:person_offsets[p + 1]` is the slice of `person_movies`
+    holding the movies of person `p`, and likewise `movie_offsets` /
+    `movie_people` hold the cast of each movie.
+
+    People, movies and edges added after construction are kept in overlay
+    dicts next to the immutable CSR arrays until merged() rebuilds them.
+    """
+
+    def __init__(self, person_ids, movie_ids,
+                 person_offsets, person_movies,
+                 movie_offsets, movie_people,
+                 person_index=None, movie_index=None):
+        """
+        `person_index` and `movie_index` map ids back to indices; they are
+        built from the id lists unless a caller already has them.
+        """
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        if person_index is None:
+            person_index = {
+                person_id: i for i, person_id in enumerate(person_ids)
+            }
+        if movie_index is None:
+            movie_index = {
+                movie_id: i for i, movie_id in enumerate(movie_ids)
+            }
+        self.person_index = person_index
+        self.movie_index = movie_index
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+        # Counts covered by the CSR arrays; later indices live in overlays
+        self.base_people = len(person_offsets) - 1
+        self.base_movies = len(movie_offsets) - 1
+        # Map person and movie indices to edges added after construction
+        self.extra_movies = {}
+        self.extra_people = {}
+
+    @classmethod
+    def from_edges(cls, person_ids, movie_ids, edge_people, edge_movies,
+                   person_index=None, movie_index=None):
+        """
+        Builds a graph from parallel arrays of (person index, movie index)
+        star edges, reusing the id to index maps if they are given.
+        """
+        person_offsets, person_movies = _csr(
+            len(person_ids), edge_people, edge_movies
+        )
+        movie_offsets, movie_people = _csr(
+            len(movie_ids), edge_movies, edge_people
+        )
+        return cls(person_ids, movie_ids,
+                   person_offsets, person_movies,
+                   movie_offsets, movie_people,
+                   person_index, movie_index)
+
+    def add_person(self, person_id):
+        """
+        Adds a person_id without edges, returning its index.
+        """
+        person = self.person_index.get(person_id)
+        if person is None:
+            person = len(self.person_ids)
+            self.person_ids.append(person_id)
+            self.person_index[person_id] = person
+        return person
+
+    def add_movie(self, movie_id):
+        """
+        Adds a movie_id without edges, returning its index.
+        """
+        movie = self.movie_index.get(movie_id)
+        if movie is None:
+            movie = len(self.movie_ids)
+            self.movie_ids.append(movie_id)
+            self.movie_index[movie_id] = movie
+        return movie
+
+    def add_edge(self, person, movie):
+        """
+        Records that a person index starred in a movie index. Returns False
+        if the edge was already present.
+        """
+        if movie in self.movies_for(person):
+            return False
+        self.extra_movies.setdefault(person, []).append(movie)
+        self.extra_people.setdefault(movie, []).append(person)
+        return True
+
+    def has_additions(self):
+        """
+        Returns True if anything was added after construction.
+        """
+        return (bool(self.extra_movies)
+                or len(self.person_ids) > self.base_people
+                or len(self.movie_ids) > self.base_movies)
+
+    def merged(self):
+        """
+        Returns a new CompactGraph with every overlay edge folded into the
+        CSR arrays.
+        """
+        edge_people = array("i")
+        edge_movies = array("i")
+        for person in range(len(self.person_ids)):
+            for movie in self.movies_for(person):
+                edge_people.append(person)
+                edge_movies.append(movie)
+        return CompactGraph.from_edges(list(self.person_ids),
+                                       list(self.movie_ids),
+                                       edge_people, edge_movies)
+
+    def movies_for(self, person):
+        """
+        Returns the movie indices a person index starred in.
+        """
+        if person < self.base_people:
+            movies = self.person_movies[
+                self.person_offsets[person]:self.person_offsets[person + 1]
+            ]
+        else:
+            movies = ()
+        extra = self.extra_movies.get(person)
+        if extra:
+            return list(movies) + extra
+        return movies
+
+    def stars_for(self, movie):
+        """
+        Returns the person indices that starred in a movie index.
+        """
+        if movie < self.base_movies:
+            stars = self.movie_people[
+                self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+            ]
+        else:
+            stars = ()
+        extra = self.extra_people.get(movie)
+        if extra:
+            return list(stars) + extra
+        return stars
+
+    def neighbors(self, person, max_cast=None, max_fanout=None):
+        """
+        Yields (movie index, person index) pairs for people who starred
+        with the given person index, skipping movies with more than
+        `max_cast` stars and taking at most `max_fanout` stars per movie.
+        The person itself does not count towards `max_fanout`, and the
+        stars taken are the first in CSR order.
+        """
+        if self.extra_people or person >= self.base_people:
+            for movie in self.movies_for(person):
+                stars = self.stars_for(movie)
+                if max_cast is not None and len(stars) > max_cast:
+                    continue
+                if max_fanout is not None:
+                    stars = [star for star in stars
+                             if star != person][:max_fanout]
+                for star in stars:
+                    yield movie, star
+            return
+
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+        for movie in self.movies_for(person):
+            start = movie_offsets[movie]
+            end = movie_offsets[movie + 1]
+            if max_cast is not None and end - start > max_cast:
+                continue
+            if max_fanout is None:
+                for i in range(start, end):
+                    yield movie, movie_people[i]
+                continue
+            taken = 0
+            for i in range(start, end):
+                if taken == max_fanout:
+                    break
+                star = movie_people[i]
+                if star != person:
+                    taken += 1
+                    yield movie, star
+
+    def path_ids(self, path):
+        """
+        Translates a path of (movie index, person index) pairs back into
+        (movie_id, person_id) pairs.
+        """
+        if path is None:
+            return None
+        return [(self.movie_ids[movie], self.person_ids[person])
+                for movie, person in path]
+
+
+def _csr(count, keys, values):
+    """
+    Groups `values` by `keys` into (offsets, index) CSR arrays with a
+    counting sort, so no per-row containers are ever allocated.
+    """
+    offsets = array("i", [0]) * (count + 1)
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(count):
+        offsets[i + 1] += offsets[i]
+
+    index = array("i", [0]) * len(values)
+    cursor = array("i", offsets)
+    for key, value in zip(keys, values):
+        index[cursor[key]] = value
+        cursor[key] += 1
+    return offsets, index
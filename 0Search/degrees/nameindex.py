@@ -0,0 +1,162 @@
+"""
+Prefix and fuzzy lookup over a large set of names.
+"""
+
+from bisect import bisect_left, insort
+
+# Smallest number of added names kept apart before they are merged in
+MERGE_MIN = 1024
+
+
+class NameIndex():
+    """
+    Sorted list of names supporting prefix completion and bounded edit
+    distance search.
+
+    The sorted list doubles as an implicit trie: consecutive names share
+    prefixes, so fuzzy search reuses edit distance rows across them and skips
+    every name under a prefix once no extension of it can be close enough.
+
+    Names added later go to a small sorted side list that lookups also
+    scan, so adding one costs time in proportion to the additions rather
+    than the whole index. The side list is merged in once it outgrows a
+    sixteenth of the main list.
+    """
+
+    def __init__(self, names=()):
+        self.names = sorted(set(names))
+        self.added = []
+
+    def __len__(self):
+        return len(self.names) + len(self.added)
+
+    def add(self, name):
+        """
+        Adds a name to the index if it is not already present.
+        """
+        if _contains(self.names, name) or _contains(self.added, name):
+            return
+        insort(self.added, name)
+        if len(self.added) > max(MERGE_MIN, len(self.names) // 16):
+            # Sorting two concatenated sorted runs is a linear merge
+            self.names += self.added
+            self.names.sort()
+            self.added = []
+
+    def complete(self, prefix, limit=10):
+        """
+        Returns up to `limit` names starting with `prefix`, in sorted order.
+        """
+        matches = (_complete(self.names, prefix, limit)
+                   + _complete(self.added, prefix, limit))
+        matches.sort()
+        return matches[:limit]
+
+    def search(self, query, max_distance=2, limit=10):
+        """
+        Returns up to `limit` (distance, name) pairs for names within
+        `max_distance` edits of `query`, closest first. Among equally close
+        names, those starting with the query rank first.
+        """
+        matches = (_search(self.names, query, max_distance)
+                   + _search(self.added, query, max_distance))
+        matches.sort()
+        return [(distance, name) for distance, _, name in matches[:limit]]
+
+
+def _contains(names, name):
+    """
+    Returns True if a sorted list holds `name`.
+    """
+    i = bisect_left(names, name)
+    return i < len(names) and names[i] == name
+
+
+def _complete(names, prefix, limit):
+    """
+    Returns up to `limit` names of a sorted list starting with `prefix`.
+    """
+    matches = []
+    i = bisect_left(names, prefix)
+    while (i < len(names) and len(matches) < limit
+           and names[i].startswith(prefix)):
+        matches.append(names[i])
+        i += 1
+    return matches
+
+
+def _search(names, query, max_distance):
+    """
+    Returns unsorted (distance, not a prefix match, name) triples for the
+    names of a sorted list within `max_distance` edits of `query`.
+    """
+    cap = max_distance + 1
+    # rows[d] is the edit distance row of query against a d-char prefix,
+    # with every distance above max_distance clipped to cap
+    rows = [[min(j, cap) for j in range(len(query) + 1)]]
+    previous = ""
+    matches = []
+    i = 0
+    while i < len(names):
+        name = names[i]
+        common = _common_prefix(previous, name, len(rows) - 1)
+        del rows[common + 1:]
+        previous = name
+
+        for depth in range(common, len(name)):
+            rows.append(
+                _next_row(rows[-1], query, name[depth], depth + 1, cap)
+            )
+            if min(rows[-1]) == cap:
+                # No name with this prefix can come within max_distance
+                previous = name[:depth + 1]
+                i = _skip_prefix(names, previous, i)
+                break
+        else:
+            distance = rows[-1][-1]
+            if distance <= max_distance:
+                matches.append(
+                    (distance, not name.startswith(query), name)
+                )
+            i += 1
+    return matches
+
+
+def _next_row(row, query, char, depth, cap):
+    """
+    Extends a clipped Levenshtein distance row by the `depth`-th character
+    of the candidate. Only cells within cap - 1 of the diagonal can hold a
+    distance below cap, so the rest are left at cap.
+    """
+    nextRow = [cap] * len(row)
+    if depth < cap:
+        nextRow[0] = depth
+    first = max(1, depth - cap + 1)
+    last = min(len(query), depth + cap - 1)
+    for j in range(first, last + 1):
+        best = row[j - 1] if query[j - 1] == char else row[j - 1] + 1
+        if row[j] + 1 < best:
+            best = row[j] + 1
+        if nextRow[j - 1] + 1 < best:
+            best = nextRow[j - 1] + 1
+        nextRow[j] = best if best < cap else cap
+    return nextRow
+
+
+def _common_prefix(a, b, limit):
+    """
+    Returns the length of the common prefix of two strings, up to `limit`.
+    """
+    n = min(len(a), len(b), limit)
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _skip_prefix(names, prefix, start):
+    """
+    Returns the index of the first name after `start` not starting with
+    `prefix`.
+    """
+    return bisect_left(names, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
@@ -0,0 +1,165 @@
+"""
+Versioned binary snapshot of a degrees dataset.
+
+A snapshot stores the people and movie string columns together with the
+CompactGraph CSR arrays, so later runs can memory-map it instead of parsing
+the CSV files again. The file records the mtimes of the CSV files it was
+built from and is considered stale as soon as any of them changes.
+
+Layout: a fixed header, a table of (offset, length, count) entries for each
+section, then the 8-byte aligned sections themselves. String columns are
+UTF-8 joined with NUL bytes; integer arrays are raw native `array("i")`
+bytes.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from graph import CompactGraph
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 1
+
+# Written in this order after the header
+SECTIONS = (
+    "person_ids", "names", "births",
+    "movie_ids", "titles", "years",
+    "person_offsets", "person_movies",
+    "movie_offsets", "movie_people",
+)
+STRING_SECTIONS = SECTIONS[:6]
+
+# magic, version, byte order, int item size, three source mtimes
+HEADER = struct.Struct("<8sIcB3q")
+ENTRY = struct.Struct("<QQQ")
+BYTE_ORDER = b"<" if sys.byteorder == "little" else b">"
+
+
+class Snapshot():
+    """
+    Columns read back from a snapshot file. The graph's integer arrays are
+    memoryviews over the mapped file.
+    """
+
+    def __init__(self, person_ids, names, births,
+                 movie_ids, titles, years, graph):
+        self.person_ids = person_ids
+        self.names = names
+        self.births = births
+        self.movie_ids = movie_ids
+        self.titles = titles
+        self.years = years
+        self.graph = graph
+
+
+def source_mtimes(sources):
+    """
+    Returns the modification times, in nanoseconds, of the source files.
+    """
+    return tuple(os.stat(source).st_mtime_ns for source in sources)
+
+
+def write_snapshot(path, sources, people, movies, graph):
+    """
+    Writes people, movies and a CompactGraph to `path`, stamped with the
+    mtimes of `sources` (people.csv, movies.csv and stars.csv).
+    """
+    if graph.has_additions():
+        graph = graph.merged()
+
+    columns = {
+        "person_ids": graph.person_ids,
+        "names": [people[person_id]["name"]
+                  for person_id in graph.person_ids],
+        "births": [people[person_id]["birth"] or ""
+                   for person_id in graph.person_ids],
+        "movie_ids": graph.movie_ids,
+        "titles": [movies[movie_id]["title"]
+                   for movie_id in graph.movie_ids],
+        "years": [movies[movie_id]["year"] or ""
+                  for movie_id in graph.movie_ids],
+        "person_offsets": graph.person_offsets,
+        "person_movies": graph.person_movies,
+        "movie_offsets": graph.movie_offsets,
+        "movie_people": graph.movie_people,
+    }
+
+    blobs = []
+    for name in SECTIONS:
+        column = columns[name]
+        if name in STRING_SECTIONS:
+            blob = "\0".join(column).encode("utf-8")
+        else:
+            blob = array("i", column).tobytes()
+        blobs.append((blob, len(column)))
+
+    offset = _align(HEADER.size + ENTRY.size * len(SECTIONS))
+    entries = []
+    for blob, count in blobs:
+        entries.append(ENTRY.pack(offset, len(blob), count))
+        offset = _align(offset + len(blob))
+
+    header = HEADER.pack(MAGIC, VERSION, BYTE_ORDER, array("i").itemsize,
+                         *source_mtimes(sources))
+
+    # Write to a temporary file first so readers never see a partial file
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(header)
+        f.write(b"".join(entries))
+        for blob, _ in blobs:
+            f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(blob)
+    os.replace(temporary, path)
+
+
+def read_snapshot(path, sources):
+    """
+    Memory-maps the snapshot at `path` and returns a Snapshot, or None if
+    the file is missing, was written by another format version, or is
+    stale with respect to the mtimes of `sources`.
+    """
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        return None
+    magic, version, byte_order, itemsize, *mtimes = HEADER.unpack_from(view)
+    if (magic != MAGIC or version != VERSION or byte_order != BYTE_ORDER
+            or itemsize != array("i").itemsize
+            or tuple(mtimes) != source_mtimes(sources)):
+        return None
+
+    columns = {}
+    for i, name in enumerate(SECTIONS):
+        offset, length, count = ENTRY.unpack_from(
+            view, HEADER.size + i * ENTRY.size
+        )
+        section = view[offset:offset + length]
+        if name in STRING_SECTIONS:
+            columns[name] = (
+                bytes(section).decode("utf-8").split("\0") if count else []
+            )
+        else:
+            columns[name] = section.cast("i")
+
+    graph = CompactGraph(columns["person_ids"], columns["movie_ids"],
+                         columns["person_offsets"], columns["person_movies"],
+                         columns["movie_offsets"], columns["movie_people"])
+    return Snapshot(columns["person_ids"], columns["names"], columns["births"],
+                    columns["movie_ids"], columns["titles"], columns["years"],
+                    graph)
+
+
+def _align(offset):
+    """
+    Rounds an offset up to the next multiple of 8 bytes.
+    """
+    return (offset + 7) & ~7
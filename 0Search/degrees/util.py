@@ -1,8 +1,16 @@
+from collections import OrderedDict, deque, namedtuple
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
 class Node():
+    __slots__ = ("state", "parent", "action", "depth")
+
     def __init__(self, state, parent, action):
         self.state = state
         self.parent = parent
         self.action = action
+        self.depth = 0 if parent is None else parent.depth + 1
 
 
 class StackFrontier():
@@ -42,3 +50,90 @@ class QueueFrontier(StackFrontier):
             self.frontier = self.frontier[1:]
             self.explored.append(node)
             return node
+
+
+class HashedStackFrontier():
+    """
+    StackFrontier with the same interface, backed by a deque and hashed
+    state sets so add, remove, contains_state and was_explored are all O(1).
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        # Maps each state in the frontier to how many nodes hold it
+        self.frontier_states = {}
+        self.explored = set()
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.frontier_states[node.state] = (
+            self.frontier_states.get(node.state, 0) + 1
+        )
+
+    def contains_state(self, state):
+        return state in self.frontier_states
+
+    def was_explored(self, state):
+        return state in self.explored
+
+    def empty(self):
+        return not self.frontier
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            return self._explore(self.frontier.pop())
+
+    def _explore(self, node):
+        count = self.frontier_states[node.state]
+        if count == 1:
+            del self.frontier_states[node.state]
+        else:
+            self.frontier_states[node.state] = count - 1
+        self.explored.add(node.state)
+        return node
+
+
+class HashedQueueFrontier(HashedStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            return self._explore(self.frontier.popleft())
+
+
+class TreeCache():
+    """
+    Least-recently-used cache of complete search trees keyed by their root.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.trees = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, root):
+        tree = self.trees.get(root)
+        if tree is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.trees.move_to_end(root)
+        return tree
+
+    def put(self, root, tree):
+        self.trees[root] = tree
+        self.trees.move_to_end(root)
+        while len(self.trees) > self.maxsize:
+            self.trees.popitem(last=False)
+
+    def clear(self):
+        self.trees.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.trees))
@@ -0,0 +1,168 @@
+"""
+Tic Tac Toe engine on bitboards.
+
+A position is a pair of 9-bit integers (x, o) with bit 3 * i + j set when
+X or O holds cell (i, j). Move generation, win detection and copies are
+single integer operations; from_board and to_board convert to and from the
+list-of-lists boards used by tictactoe.py, and minimax(board) follows the
+same contract as tictactoe.minimax.
+"""
+
+from tictactoe import X, O, EMPTY
+
+FULL = 0b111111111
+
+# Bitmasks of every row, column and diagonal
+WIN_MASKS = (0b000000111, 0b000111000, 0b111000000,
+             0b001001001, 0b010010010, 0b100100100,
+             0b100010001, 0b001010100)
+
+# Indexed by a 9-bit mask: whether it contains a full line
+WINNING = tuple(any(mask & win == win for win in WIN_MASKS)
+                for mask in range(FULL + 1))
+
+# Indexed by a 9-bit mask: how many bits it has set
+POPCOUNT = tuple(bin(mask).count("1") for mask in range(FULL + 1))
+
+# Maps (x, o) positions to the (value, move bit) solve() found for them
+table = {}
+
+# Positions visited by solve() since the last minimax()
+nodes = 0
+
+
+def from_board(board):
+    """
+    Returns the (x, o) bitboards for a list-of-lists board.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x |= 1 << (3 * i + j)
+            elif cell == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Returns the list-of-lists board for (x, o) bitboards.
+    """
+    return [[X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1
+             else EMPTY for j in range(3)] for i in range(3)]
+
+
+def player(x, o):
+    """
+    Returns player who has the next turn.
+    """
+    return X if POPCOUNT[x] == POPCOUNT[o] else O
+
+
+def actions(x, o):
+    """
+    Returns a bitmask of the empty cells.
+    """
+    return FULL & ~(x | o)
+
+
+def moves(mask):
+    """
+    Yields each set bit of a mask, lowest first.
+    """
+    while mask:
+        bit = mask & -mask
+        yield bit
+        mask ^= bit
+
+
+def result(x, o, bit):
+    """
+    Returns the position after the player to move takes the cell `bit`.
+    """
+    if (x | o) & bit:
+        raise Exception("That isn't a valid move.")
+    if POPCOUNT[x] == POPCOUNT[o]:
+        return x | bit, o
+    return x, o | bit
+
+
+def winner(x, o):
+    """
+    Returns the winner, if there is one.
+    """
+    if WINNING[x]:
+        return X
+    if WINNING[o]:
+        return O
+    return None
+
+
+def terminal(x, o):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    return WINNING[x] or WINNING[o] or x | o == FULL
+
+
+def utility(x, o):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    return 1 if WINNING[x] else -1 if WINNING[o] else 0
+
+
+def cell(bit):
+    """
+    Returns the (i, j) cell of a move bit.
+    """
+    return divmod(bit.bit_length() - 1, 3)
+
+
+def solve(x, o):
+    """
+    Returns (value, move bit) under optimal play, memoized in `table`.
+    """
+    global nodes
+
+    nodes += 1
+    entry = table.get((x, o))
+    if entry is not None:
+        return entry
+
+    if terminal(x, o):
+        entry = (utility(x, o), None)
+    elif POPCOUNT[x] == POPCOUNT[o]:
+        entry = None
+        for bit in moves(FULL & ~(x | o)):
+            value = solve(x | bit, o)[0]
+            if entry is None or value > entry[0]:
+                entry = (value, bit)
+                if value == 1:
+                    break
+    else:
+        entry = None
+        for bit in moves(FULL & ~(x | o)):
+            value = solve(x, o | bit)[0]
+            if entry is None or value < entry[0]:
+                entry = (value, bit)
+                if value == -1:
+                    break
+
+    table[(x, o)] = entry
+    return entry
+
+
+def minimax(board):
+    """
+    Returns the optimal action (i, j) for the current player on a
+    list-of-lists board.
+    """
+    global nodes
+
+    nodes = 0
+    x, o = from_board(board)
+    if terminal(x, o):
+        return None
+    return cell(solve(x, o)[1])
@@ -0,0 +1,168 @@
+"""
+Symmetry-reduced opening book for Tic Tac Toe.
+
+Every reachable position is reduced to a canonical representative under the
+8 symmetries of the board, solved once, and stored as a sorted table of
+base-3 position codes with the optimal move for each. tictactoe.minimax
+answers from the book by canonicalizing the board, looking the code up and
+mapping the move back through the symmetry.
+
+Build the book with `python book.py`.
+"""
+
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+import tictactoe as ttt
+
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "book.bin")
+
+MAGIC = b"TTTBOOK\0"
+VERSION = 1
+
+# magic, version, number of positions
+HEADER = struct.Struct("<8sHH")
+
+# Base-3 digit of each cell value and the weight of each cell
+DIGITS = {ttt.EMPTY: 0, ttt.X: 1, ttt.O: 2}
+POWERS = tuple(3 ** i for i in range(9))
+
+
+def _rotate(symmetry):
+    """
+    Composes a symmetry with a quarter turn of the board.
+    """
+    return tuple(symmetry[3 * (2 - j) + i] for i in range(3) for j in range(3))
+
+
+def _mirror(symmetry):
+    """
+    Composes a symmetry with a left-right reflection of the board.
+    """
+    return tuple(symmetry[3 * i + 2 - j] for i in range(3) for j in range(3))
+
+
+def _symmetries():
+    """
+    Returns the 8 symmetries of the board as cell permutations: symmetry s
+    maps a key to tuple(key[s[i]] for i in range(9)).
+    """
+    symmetries = []
+    symmetry = tuple(range(9))
+    for _ in range(4):
+        symmetries.append(symmetry)
+        symmetries.append(_mirror(symmetry))
+        symmetry = _rotate(symmetry)
+    return symmetries
+
+
+SYMMETRIES = _symmetries()
+
+
+def canonical(key):
+    """
+    Returns (code, symmetry) for the smallest base-3 code any symmetry of
+    the board key maps to.
+    """
+    digits = [DIGITS[cell] for cell in key]
+    best = None
+    for symmetry in SYMMETRIES:
+        code = 0
+        for i, source in enumerate(symmetry):
+            code += digits[source] * POWERS[i]
+        if best is None or code < best[0]:
+            best = (code, symmetry)
+    return best
+
+
+def build():
+    """
+    Solves every reachable non-terminal position up to symmetry, returning
+    parallel arrays of sorted canonical codes and optimal cell indices in
+    the canonical orientation.
+    """
+    moves = {}
+    stack = [ttt.board_key(ttt.initial_state())]
+    while stack:
+        key = stack.pop()
+        if ttt.key_winner(key) is not None or ttt.EMPTY not in key:
+            continue
+        code, symmetry = canonical(key)
+        if code in moves:
+            continue
+        canonicalKey = tuple(key[source] for source in symmetry)
+        i, j = ttt.solve(ttt.Position(canonicalKey))[1]
+        moves[code] = 3 * i + j
+
+        turn = ttt.X if key.count(ttt.X) <= key.count(ttt.O) else ttt.O
+        for cell, value in enumerate(key):
+            if value == ttt.EMPTY:
+                stack.append(key[:cell] + (turn,) + key[cell + 1:])
+
+    codes = array("H", sorted(moves))
+    cells = array("B", [moves[code] for code in codes])
+    return codes, cells
+
+
+def write(path, codes, cells):
+    """
+    Writes a book to `path`.
+    """
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(codes)))
+        f.write(codes.tobytes())
+        f.write(cells.tobytes())
+
+
+def load(path=BOOK_FILE):
+    """
+    Returns the (codes, cells) arrays of the book at `path`, or None if it
+    is missing or in another format.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, version, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        return None
+
+    codes = array("H")
+    codes.frombytes(data[HEADER.size:HEADER.size + 2 * count])
+    cells = array("B")
+    cells.frombytes(data[HEADER.size + 2 * count:HEADER.size + 3 * count])
+    if len(codes) != count or len(cells) != count:
+        return None
+    return codes, cells
+
+
+def lookup(book, board):
+    """
+    Returns the optimal action (i, j) for the board from a book, or None if
+    the position is not in it.
+    """
+    codes, cells = book
+    code, symmetry = canonical(ttt.board_key(board))
+    index = bisect_left(codes, code)
+    if index == len(codes) or codes[index] != code:
+        return None
+    # Canonical cell c holds the board's cell symmetry[c]
+    return divmod(symmetry[cells[index]], 3)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else BOOK_FILE
+    codes, cells = build()
+    write(path, codes, cells)
+    print(f"Wrote {len(codes)} positions to {path}.")
+
+
+if __name__ == "__main__":
+    main()
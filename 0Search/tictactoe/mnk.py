@@ -0,0 +1,340 @@
+"""
+m,n,k-game engine: Tic Tac Toe generalized to an m x n board won by k in a
+row.
+
+Boards are lists of m rows of n cells, like tictactoe.py's 3 x 3 boards.
+Wins are detected incrementally around the last move, and best_move runs an
+iterative-deepening alpha-beta search with a heuristic evaluation kept up
+to date move by move, so it returns a move within its time budget even on
+boards far too large to search exhaustively. Immediate wins and forced
+blocks are played without searching.
+"""
+
+import time
+
+from tictactoe import X, O, EMPTY
+
+# Default time budget of a move search, in seconds
+TIME_LIMIT = 1.0
+
+# Score of a won position; heuristic scores always stay well below it
+WIN = 10 ** 12
+
+# The four line directions: right, down, down-right and down-left
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+# Positions visited by the last minimax()
+nodes = 0
+
+
+class Timeout(Exception):
+    """Raised inside a search when its deadline has passed."""
+
+
+class MNKGame():
+
+    def __init__(self, m=3, n=3, k=3):
+        """
+        Initialize a game on an m-row, n-column board won by k in a row.
+        """
+        if not 1 <= k <= max(m, n):
+            raise ValueError("k must fit on the board")
+        self.m = m
+        self.n = n
+        self.k = k
+        # Positions visited by the last best_move()
+        self.nodes = 0
+
+        # Every k-cell line on the board, for the heuristic evaluation
+        self.windows = []
+        for i in range(m):
+            for j in range(n):
+                for di, dj in DIRECTIONS:
+                    end_i = i + di * (k - 1)
+                    end_j = j + dj * (k - 1)
+                    if 0 <= end_i < m and 0 <= end_j < n:
+                        self.windows.append(tuple(
+                            (i + di * step, j + dj * step)
+                            for step in range(k)
+                        ))
+
+        # Indices of the windows through each cell
+        self.cell_windows = [[[] for j in range(n)] for i in range(m)]
+        for index, window in enumerate(self.windows):
+            for i, j in window:
+                self.cell_windows[i][j].append(index)
+
+        # Pieces of each player in every window, and the evaluation of the
+        # board they were counted on, kept up to date by _play and _unplay
+        self.counts = {X: [], O: []}
+        self.score = 0
+
+        # Cells ordered from the center outwards, which tends to search
+        # the strongest moves first
+        center_i = (m - 1) / 2
+        center_j = (n - 1) / 2
+        self.cells = sorted(
+            ((i, j) for i in range(m) for j in range(n)),
+            key=lambda cell: (abs(cell[0] - center_i)
+                              + abs(cell[1] - center_j))
+        )
+
+    def initial_state(self):
+        """
+        Returns starting state of the board.
+        """
+        return [[EMPTY] * self.n for _ in range(self.m)]
+
+    def player(self, board):
+        """
+        Returns player who has the next turn on a board.
+        """
+        xCount = sum(row.count(X) for row in board)
+        oCount = sum(row.count(O) for row in board)
+        return X if xCount <= oCount else O
+
+    def actions(self, board):
+        """
+        Returns set of all possible actions (i, j) available on the board.
+        """
+        return {(i, j) for i in range(self.m) for j in range(self.n)
+                if board[i][j] == EMPTY}
+
+    def result(self, board, action):
+        """
+        Returns the board that results from making move (i, j) on the board.
+        """
+        i, j = action
+        if board[i][j] != EMPTY:
+            raise Exception("That isn't a valid move.")
+        new = [row.copy() for row in board]
+        new[i][j] = self.player(board)
+        return new
+
+    def wins_at(self, board, i, j):
+        """
+        Returns True if the piece at (i, j) completes k in a row, checking
+        only the lines through that cell.
+        """
+        piece = board[i][j]
+        if piece == EMPTY:
+            return False
+        for di, dj in DIRECTIONS:
+            count = 1
+            for sign in (1, -1):
+                r = i + sign * di
+                c = j + sign * dj
+                while (0 <= r < self.m and 0 <= c < self.n
+                       and board[r][c] == piece):
+                    count += 1
+                    r += sign * di
+                    c += sign * dj
+            if count >= self.k:
+                return True
+        return False
+
+    def winner(self, board):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        for i in range(self.m):
+            for j in range(self.n):
+                if self.wins_at(board, i, j):
+                    return board[i][j]
+        return None
+
+    def terminal(self, board):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        return (self.winner(board) is not None
+                or all(cell != EMPTY for row in board for cell in row))
+
+    def utility(self, board):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        won = self.winner(board)
+        return 1 if won == X else -1 if won == O else 0
+
+    def evaluate(self, board):
+        """
+        Returns a heuristic score of the board for X: every k-cell line that
+        only one player occupies counts for that player, growing tenfold
+        with each extra piece in it.
+        """
+        score = 0
+        for window in self.windows:
+            xCount = oCount = 0
+            for i, j in window:
+                cell = board[i][j]
+                if cell == X:
+                    xCount += 1
+                elif cell == O:
+                    oCount += 1
+            if xCount and not oCount:
+                score += 10 ** (xCount - 1)
+            elif oCount and not xCount:
+                score -= 10 ** (oCount - 1)
+        return score
+
+    def _window_score(self, index):
+        """
+        Returns what the window at `index` adds to the evaluation for X.
+        """
+        xCount = self.counts[X][index]
+        oCount = self.counts[O][index]
+        if xCount and not oCount:
+            return 10 ** (xCount - 1)
+        if oCount and not xCount:
+            return -(10 ** (oCount - 1))
+        return 0
+
+    def _count(self, board):
+        """
+        Counts the pieces in every window of the board and its evaluation.
+        """
+        for piece in (X, O):
+            self.counts[piece] = [
+                sum(board[i][j] == piece for i, j in window)
+                for window in self.windows
+            ]
+        self.score = sum(self._window_score(index)
+                         for index in range(len(self.windows)))
+
+    def _play(self, board, i, j, piece):
+        """
+        Places a piece on the board, updating the window counts and the
+        evaluation around it. Returns True if it completes k in a row.
+        """
+        board[i][j] = piece
+        counts = self.counts[piece]
+        won = False
+        for index in self.cell_windows[i][j]:
+            self.score -= self._window_score(index)
+            counts[index] += 1
+            self.score += self._window_score(index)
+            if counts[index] == self.k:
+                won = True
+        return won
+
+    def _unplay(self, board, i, j, piece):
+        """
+        Takes back a piece placed by _play.
+        """
+        board[i][j] = EMPTY
+        counts = self.counts[piece]
+        for index in self.cell_windows[i][j]:
+            self.score -= self._window_score(index)
+            counts[index] -= 1
+            self.score += self._window_score(index)
+
+    def _winning_cells(self, board, piece):
+        """
+        Returns the empty cells, in search order, where `piece` would
+        complete k in a row.
+        """
+        counts = self.counts[piece]
+        return [(i, j) for i, j in self.cells
+                if board[i][j] == EMPTY
+                and any(counts[index] == self.k - 1
+                        for index in self.cell_windows[i][j])]
+
+    def best_move(self, board, time_limit=TIME_LIMIT):
+        """
+        Returns the best action found for the current player within
+        `time_limit` seconds by iterative deepening, or None if the game is
+        over. A move is always returned, searched to at least depth 1
+        unless even that exceeds the budget. A winning move is played at
+        once, and so is a block when the opponent threatens to win.
+        """
+        self.nodes = 0
+        if self.terminal(board):
+            return None
+
+        deadline = time.perf_counter() + time_limit
+        board = [row.copy() for row in board]
+        turn = self.player(board)
+        other = O if turn == X else X
+        self._count(board)
+
+        wins = self._winning_cells(board, turn)
+        if wins:
+            return wins[0]
+        # Any move but a block loses at once, and with several threats
+        # every move does
+        threats = self._winning_cells(board, other)
+        if threats:
+            return threats[0]
+
+        empty = sum(row.count(EMPTY) for row in board)
+        best = next(cell for cell in self.cells
+                    if board[cell[0]][cell[1]] == EMPTY)
+
+        for depth in range(1, empty + 1):
+            try:
+                score, move = self._negamax(board, turn, depth, -WIN - 1,
+                                            WIN + 1, deadline, best)
+            except Timeout:
+                break
+            best = move
+            # A forced win or loss needs no deeper search
+            if abs(score) > WIN:
+                break
+        return best
+
+    def _negamax(self, board, turn, depth, alpha, beta, deadline,
+                 first=None):
+        """
+        Alpha-beta search to `depth` plies, returning (score, move) from the
+        point of view of `turn`. Moves are made and unmade on `board`.
+        """
+        self.nodes += 1
+        other = O if turn == X else X
+
+        moves = [cell for cell in self.cells
+                 if board[cell[0]][cell[1]] == EMPTY]
+        if first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+
+        best = None
+        bestMove = None
+        for i, j in moves:
+            if time.perf_counter() > deadline:
+                raise Timeout
+            won = self._play(board, i, j, turn)
+            try:
+                if won:
+                    # Prefer quicker wins
+                    score = WIN + depth
+                elif len(moves) == 1:
+                    score = 0
+                elif depth == 1:
+                    score = self.score if turn == X else -self.score
+                else:
+                    score = -self._negamax(board, other, depth - 1,
+                                           -beta, -alpha, deadline)[0]
+            finally:
+                self._unplay(board, i, j, turn)
+
+            if best is None or score > best:
+                best = score
+                bestMove = (i, j)
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+        return best, bestMove
+
+
+def minimax(board, k=3, time_limit=TIME_LIMIT):
+    """
+    Returns the best action found for the current player on an m x n board
+    won by `k` in a row, within `time_limit` seconds.
+    """
+    global nodes
+
+    game = MNKGame(len(board), len(board[0]), k)
+    action = game.best_move(board, time_limit)
+    nodes = game.nodes
+    return action
@@ -1,8 +1,17 @@
+import importlib
 import pygame
 import sys
 import time
 
 import tictactoe as ttt
+from worker import MoveWorker
+
+# Module whose minimax(board) picks the computer's moves, e.g. bitboard
+engine = importlib.import_module(sys.argv[1] if len(sys.argv) > 1
+                                 else "tictactoe")
+
+# Shortest time a computer move takes to appear, in seconds
+MIN_THINK_TIME = 0.5
 
 pygame.init()
 size = width, height = 600, 400
@@ -17,14 +26,18 @@ mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
+clock = pygame.time.Clock()
+
 user = None
 board = ttt.initial_state()
-ai_turn = False
+worker = MoveWorker(engine)
+ai_started = None
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            worker.cancel()
             sys.exit()
 
     screen.fill(black)
@@ -102,21 +115,24 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            dots = int(time.time() * 3) % 4
+            title = "Computer thinking" + "." * dots + " " * (3 - dots)
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Check for AI move, searched in the background so frames keep
+        # being drawn
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if ai_started is None:
+                worker.start(board)
+                ai_started = time.time()
+            elif time.time() - ai_started >= MIN_THINK_TIME:
+                done, move = worker.result()
+                if done:
+                    board = ttt.result(board, move)
+                    ai_started = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
@@ -141,6 +157,8 @@ while True:
                     time.sleep(0.2)
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
+                    worker.cancel()
+                    ai_started = None
 
     pygame.display.flip()
+    clock.tick(60)
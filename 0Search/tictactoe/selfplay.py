@@ -0,0 +1,236 @@
+"""
+Headless self-play for Tic Tac Toe engines.
+
+Plays a number of games between two engines across a process pool, without
+a display, and reports games per second, nodes searched per move, move
+latency percentiles and outcomes as one JSON document, so changes to the
+search can be benchmarked from the command line:
+
+    python selfplay.py --x minimax --o random --games 1000
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+
+import bitboard
+import book
+import mnk
+import tictactoe as ttt
+
+# Time budget of a move by the mnk engine, in seconds
+MNK_TIME_LIMIT = 0.05
+
+# Opening book used by the "book" engine, loaded or built by initialize()
+opening_book = None
+
+# Start tables empty before every game instead of keeping them warm
+cold = False
+
+
+def random_move(board, rng):
+    """
+    Returns a uniformly random action on the board.
+    """
+    return rng.choice(sorted(ttt.actions(board)))
+
+
+def search_move(board, rng):
+    """
+    Returns tictactoe's alpha-beta action, ignoring the opening book.
+    """
+    return ttt.search(board)[1]
+
+
+def book_move(board, rng):
+    """
+    Returns the opening book's action for the board.
+    """
+    return book.lookup(opening_book, board)
+
+
+# Maps engine names to (function(board, rng), module counting the nodes it
+# searches in `nodes`, or None for engines that search none)
+ENGINES = {
+    "minimax": (lambda board, rng: ttt.minimax(board), ttt),
+    "search": (search_move, ttt),
+    "book": (book_move, None),
+    "bitboard": (lambda board, rng: bitboard.minimax(board), bitboard),
+    "mnk": (lambda board, rng: mnk.minimax(board, 3, MNK_TIME_LIMIT), mnk),
+    "random": (random_move, None),
+}
+
+
+def initialize(cold_tables):
+    """
+    Prepares a worker process.
+    """
+    global cold, opening_book
+
+    cold = cold_tables
+    opening_book = book.load()
+    if opening_book is None:
+        opening_book = book.build()
+
+
+def clear_tables():
+    """
+    Empties the tables the engines memoize positions in.
+    """
+    ttt.table.clear()
+    ttt.killers.clear()
+    bitboard.table.clear()
+
+
+def play(game):
+    """
+    Plays one game given as (index, X engine name, O engine name, seed),
+    returning a JSON-ready dict with the winner and, for every move, the
+    player, latency in seconds and nodes searched (0 for the book and
+    random engines, which search none).
+    """
+    index, x_engine, o_engine, seed = game
+    rng = random.Random(seed * 1000003 + index)
+    if cold:
+        clear_tables()
+
+    engines = {ttt.X: ENGINES[x_engine], ttt.O: ENGINES[o_engine]}
+    board = ttt.initial_state()
+    moves = []
+    while not ttt.terminal(board):
+        turn = ttt.player(board)
+        function, counter = engines[turn]
+        if counter is not None:
+            counter.nodes = 0
+        start = time.perf_counter()
+        action = function(board, rng)
+        seconds = time.perf_counter() - start
+        board = ttt.result(board, action)
+        moves.append((turn, seconds, counter.nodes if counter else 0))
+    return {"winner": ttt.winner(board), "moves": moves}
+
+
+def percentile(values, fraction):
+    """
+    Returns the nearest-rank percentile of sorted values.
+    """
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * fraction // 1))
+    return values[int(rank) - 1]
+
+
+def summarize(engine, moves):
+    """
+    Returns a record of the latencies and node counts of an engine's moves,
+    with None for every statistic if it made none.
+    """
+    record = {"engine": engine, "moves": len(moves)}
+    if not moves:
+        for field in ("latency_p50_ms", "latency_p99_ms", "latency_max_ms",
+                      "nodes_per_move"):
+            record[field] = None
+        return record
+
+    latencies = sorted(seconds for seconds, _ in moves)
+    record["latency_p50_ms"] = round(percentile(latencies, 0.5) * 1000, 6)
+    record["latency_p99_ms"] = round(percentile(latencies, 0.99) * 1000, 6)
+    record["latency_max_ms"] = round(latencies[-1] * 1000, 6)
+    record["nodes_per_move"] = round(
+        sum(nodes for _, nodes in moves) / len(moves), 3
+    )
+    return record
+
+
+def run(x_engine, o_engine, games=100, workers=None, seed=0,
+        cold_tables=False, chunksize=16):
+    """
+    Plays `games` games of `x_engine` as X against `o_engine` as O and
+    returns a report of throughput, per-engine move statistics and
+    outcomes.
+    """
+    for engine in (x_engine, o_engine):
+        if engine not in ENGINES:
+            raise ValueError(f"unknown engine: {engine}")
+
+    jobs = [(index, x_engine, o_engine, seed) for index in range(games)]
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+
+    start = time.perf_counter()
+    outcomes = {ttt.X: 0, ttt.O: 0, None: 0}
+    moves = {ttt.X: [], ttt.O: []}
+    lengths = 0
+    with context.Pool(workers, initialize, (cold_tables,)) as pool:
+        for game in pool.imap_unordered(play, jobs, chunksize):
+            outcomes[game["winner"]] += 1
+            lengths += len(game["moves"])
+            for turn, seconds, nodes in game["moves"]:
+                moves[turn].append((seconds, nodes))
+    seconds = time.perf_counter() - start
+
+    return {
+        "games": games,
+        "seconds": round(seconds, 6),
+        "games_per_second": round(games / seconds, 3) if seconds else None,
+        "x": summarize(x_engine, moves[ttt.X]),
+        "o": summarize(o_engine, moves[ttt.O]),
+        "outcomes": {
+            "x_wins": outcomes[ttt.X],
+            "o_wins": outcomes[ttt.O],
+            "draws": outcomes[None],
+        },
+        "moves_per_game": round(lengths / games, 3) if games else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--x", default="minimax", choices=sorted(ENGINES),
+                        help="engine playing X")
+    parser.add_argument("--o", default="random", choices=sorted(ENGINES),
+                        help="engine playing O")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=16,
+                        help="games handed to a worker at a time")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the random engine")
+    parser.add_argument("--cold", action="store_true",
+                        help="empty the engines' tables before every game")
+    parser.add_argument("--output", help="write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.x, args.o, args.games, args.workers, args.seed,
+                  args.cold, args.chunksize)
+    report = {
+        "config": {
+            "x": args.x,
+            "o": args.o,
+            "games": args.games,
+            "workers": args.workers,
+            "seed": args.seed,
+            "cold": args.cold,
+        },
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
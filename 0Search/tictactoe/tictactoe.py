@@ -9,6 +9,45 @@ X = "X"
 O = "O"
 EMPTY = None
 
+# Row-major cell indices of every row, column and diagonal
+LINES = [(0, 1, 2), (3, 4, 5), (6, 7, 8),
+         (0, 3, 6), (1, 4, 7), (2, 5, 8),
+         (0, 4, 8), (2, 4, 6)]
+
+# Row-major cell indices in search order: center, corners, then edges
+MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+# Maps a killer cell index, or None, to the search order trying it first
+KILLER_ORDERS = {killer: ((killer,) if killer is not None else ())
+                 + tuple(i for i in MOVE_ORDER if i != killer)
+                 for killer in (None,) + MOVE_ORDER}
+
+# The (i, j) action and the lines through each row-major cell index
+CELLS = tuple(divmod(i, 3) for i in range(9))
+CELL_LINES = tuple(tuple(line for line in LINES if i in line)
+                   for i in range(9))
+
+# Amount a piece on each cell index adds to a Position's base-3 code
+CODE_WEIGHTS = {X: tuple(3 ** i for i in range(9)),
+                O: tuple(2 * 3 ** i for i in range(9))}
+
+# Kinds of value stored in the table: exact, or a lower or upper bound
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Maps Position codes to the (value, action, bound) solve() found for them
+table = {}
+
+# Maps a ply (pieces on the board) to the last cell that caused a cutoff
+killers = {}
+
+# Positions visited by the last search()
+nodes = 0
+
+# (codes, cells) arrays of book.py's opening book, loaded on first use
+opening_book = None
+
 
 def initial_state():
     """
@@ -117,37 +156,178 @@ def minimax(board):
     """
     if terminal(board):
         return None
-    if player(board) == X:
-        return maxPlay(board, actions(board))[1]
-    else:
-        return minPlay(board, actions(board))[1]
+    action = book_move(board)
+    if action is None:
+        action = search(board)[1]
+    return action
 
-def maxPlay(board, actionsSet):
-    if terminal(board):
-        return (utility(board), None)
 
-    actionsOrdered = {}
+def book_move(board):
+    """
+    Returns the opening book's action for the board, or None if no book
+    has been built or the board is not in it.
+    """
+    global opening_book
+
+    # Imported here since book.py builds on this module
+    import book
 
-    for action in actionsSet:
-        newBoard = result(board, action)
-        score = minPlay(newBoard, actions(newBoard))[0]
-        actionsOrdered[score] = action
-        if score==1:
-            break
-    
-    return sorted(actionsOrdered.items())[-1]
+    if opening_book is None:
+        opening_book = book.load() or ()
+    if not opening_book:
+        return None
+    return book.lookup(opening_book, board)
 
-def minPlay(board, actionsSet):
-    if terminal(board):
-        return (utility(board), None)
 
-    actionsOrdered = {}
+def search(board):
+    """
+    Returns (value, action, nodes) for the current player on the board,
+    where value is the utility the game ends with under optimal play and
+    nodes is the number of positions the search visited.
+    """
+    global nodes
+
+    nodes = 0
+    value, action = solve(Position(board_key(board)))
+    return value, action, nodes
+
+
+def board_key(board):
+    """
+    Returns a hashable encoding of the board: its cells in row-major order.
+    """
+    return tuple(cell for row in board for cell in row)
+
+
+class Position():
+    """
+    Mutable board for search. make() and unmake() place and remove a piece
+    in place, keeping the side to move, the number of pieces, the winner
+    and a base-3 code of the cells up to date, so searching a move
+    allocates nothing.
+    """
+
+    __slots__ = ("cells", "turn", "count", "code", "won")
+
+    def __init__(self, key):
+        """
+        Initialize a position from a board key.
+        """
+        self.cells = list(key)
+        self.count = 9 - self.cells.count(EMPTY)
+        self.turn = X if self.cells.count(X) <= self.cells.count(O) else O
+        self.code = sum(CODE_WEIGHTS[cell][i]
+                        for i, cell in enumerate(self.cells)
+                        if cell != EMPTY)
+        self.won = key_winner(self.cells)
+
+    def make(self, i):
+        """
+        Places the piece of the player to move on cell index i.
+        """
+        cells = self.cells
+        turn = self.turn
+        cells[i] = turn
+        self.code += CODE_WEIGHTS[turn][i]
+        self.count += 1
+        for a, b, c in CELL_LINES[i]:
+            if cells[a] == cells[b] == cells[c]:
+                self.won = turn
+                break
+        self.turn = O if turn == X else X
+
+    def unmake(self, i):
+        """
+        Takes back the piece last placed on cell index i.
+        """
+        turn = self.cells[i]
+        self.cells[i] = EMPTY
+        self.code -= CODE_WEIGHTS[turn][i]
+        self.count -= 1
+        # No move is made once the game is won, so undoing one never
+        # restores a won position
+        self.won = None
+        self.turn = turn
+
+
+def solve(position, alpha=-1, beta=1):
+    """
+    Returns (value, action) for a Position with an alpha-beta search, where
+    value is the utility the game ends with. Moves are made and unmade on
+    the position, which is left as it was.
+
+    The value is exact when it lies strictly inside (alpha, beta); otherwise
+    it is only a bound past that side of the window. With the full window
+    (-1, 1), the value and action are always optimal.
+
+    Results are memoized in `table` with the kind of bound they are, so
+    positions reached through different move orders are searched once and
+    later games reuse them for as long as the module stays loaded.
+    """
+    global nodes
+
+    nodes += 1
+    code = position.code
+    entry = table.get(code)
+    if entry is not None:
+        value, action, bound = entry
+        if (bound == EXACT or (bound == LOWER and value >= beta)
+                or (bound == UPPER and value <= alpha)):
+            return value, action
 
-    for action in actionsSet:
-        newBoard = result(board, action)
-        score = maxPlay(newBoard, actions(newBoard))[0]
-        actionsOrdered[score] = action
-        if score==-1:
+    won = position.won
+    if won is not None or position.count == 9:
+        value = 1 if won == X else -1 if won == O else 0
+        table[code] = (value, None, EXACT)
+        return value, None
+
+    cells = position.cells
+    maximizing = position.turn == X
+    ply = position.count
+    window = (alpha, beta)
+    best = None
+    action = None
+    for i in ordered_moves(ply):
+        if cells[i] != EMPTY:
+            continue
+        position.make(i)
+        value = solve(position, alpha, beta)[0]
+        position.unmake(i)
+        if maximizing:
+            if best is None or value > best:
+                best, action = value, CELLS[i]
+            alpha = max(alpha, value)
+        else:
+            if best is None or value < best:
+                best, action = value, CELLS[i]
+            beta = min(beta, value)
+        if alpha >= beta:
+            killers[ply] = i
             break
 
-    return sorted(actionsOrdered.items())[0]
+    if best <= window[0]:
+        table[code] = (best, action, UPPER)
+    elif best >= window[1]:
+        table[code] = (best, action, LOWER)
+    else:
+        table[code] = (best, action, EXACT)
+    return best, action
+
+
+def ordered_moves(ply):
+    """
+    Returns every cell index in search order: the killer move that last
+    caused a cutoff at this ply, then center, corners and edges. Occupied
+    cells are left for the caller to skip.
+    """
+    return KILLER_ORDERS[killers.get(ply)]
+
+
+def key_winner(key):
+    """
+    Returns the winner of the board encoded by `key`, if there is one.
+    """
+    for a, b, c in LINES:
+        if key[a] != EMPTY and key[a] == key[b] == key[c]:
+            return key[a]
+    return None
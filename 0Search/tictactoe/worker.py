@@ -0,0 +1,81 @@
+"""
+Background move computation for the Tic Tac Toe runner.
+
+A MoveWorker runs an engine's minimax(board) on a daemon thread so the
+pygame loop keeps drawing while the computer thinks. Every start() or
+cancel() begins a new generation, and results of older generations are
+dropped, so a reset game never receives a move searched for the old board.
+"""
+
+import threading
+
+
+class MoveWorker():
+
+    def __init__(self, engine):
+        """
+        Wraps `engine`, any module or object with a minimax(board) function.
+        """
+        self.engine = engine
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.done = False
+        self.move = None
+        self.error = None
+
+    def start(self, board):
+        """
+        Starts computing the move for the board, replacing any search
+        still in progress.
+        """
+        with self.lock:
+            self.generation += 1
+            self.done = False
+            self.move = None
+            self.error = None
+            generation = self.generation
+        board = [row.copy() for row in board]
+        threading.Thread(target=self._run, args=(generation, board),
+                         daemon=True).start()
+
+    def _run(self, generation, board):
+        """
+        Computes a move and stores it unless the search went stale.
+        """
+        move = error = None
+        try:
+            move = self.engine.minimax(board)
+        except Exception as e:
+            error = e
+        with self.lock:
+            if generation == self.generation:
+                self.done = True
+                self.move = move
+                self.error = error
+
+    def cancel(self):
+        """
+        Discards the search in progress, if any. Python threads cannot be
+        interrupted, so it runs to completion in the background but its
+        result is ignored.
+        """
+        with self.lock:
+            self.generation += 1
+            self.done = False
+            self.move = None
+            self.error = None
+
+    def result(self):
+        """
+        Returns (True, move) once the current search has finished, and
+        (False, None) before that. Re-raises an error from the engine.
+        """
+        with self.lock:
+            if not self.done:
+                return False, None
+            self.done = False
+            move, error = self.move, self.error
+            self.move = self.error = None
+        if error is not None:
+            raise error
+        return True, move
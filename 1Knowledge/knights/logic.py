@@ -1,7 +1,86 @@
+import functools
 import itertools
+import weakref
+
+# model_check evaluates blocks of 2 ** BLOCK_BITS models at once
+BLOCK_BITS = 12
+
+
+def cached(method):
+    """
+    Caches the result of a sentence method in the slot of the same name
+    with a leading underscore, since sentences never change.
+    """
+    slot = "_" + method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self):
+        value = getattr(self, slot)
+        if value is None:
+            value = method(self)
+            object.__setattr__(self, slot, value)
+        return value
+    return wrapper
+
+
+def union_symbols(sentences):
+    """
+    Returns the symbols of all the sentences. When one sentence already has
+    every symbol, its frozenset is shared instead of copied.
+    """
+    sets = [sentence.symbols() for sentence in sentences]
+    if not sets:
+        return frozenset()
+    largest = max(sets, key=len)
+    if all(symbols <= largest for symbols in sets):
+        return largest
+    return largest.union(*sets)
 
 
 class Sentence():
+    """
+    Sentences are immutable and hash-consed: constructing a sentence equal
+    to one that already exists returns the existing object, so equal
+    subformulas share one node, and equality and hashing are by identity
+    in constant time. symbols() and formula() are computed once, on first
+    use.
+    """
+
+    __slots__ = ("_symbols", "_formula", "__weakref__")
+
+    # Names of the slots a subclass stores its parts in
+    fields = ()
+
+    # Maps (class, *parts) to the live sentence with those parts
+    instances = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, *values):
+        """
+        Returns the sentence of class `cls` with `values` in its fields,
+        creating it if none exists.
+        """
+        key = (cls,) + values
+        sentence = Sentence.instances.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            for field, value in zip(cls.fields, values):
+                object.__setattr__(sentence, field, value)
+            object.__setattr__(sentence, "_symbols", None)
+            object.__setattr__(sentence, "_formula", None)
+            Sentence.instances[key] = sentence
+        return sentence
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("sentences are immutable")
+
+    def __reduce__(self):
+        # Copies and unpickled sentences are interned again
+        return (self.__class__,
+                tuple(getattr(self, field) for field in self.fields))
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -12,8 +91,24 @@ class Sentence():
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        return frozenset()
+
+    def lower(self, index, lines, temps):
+        """
+        Appends statements computing the sentence to `lines`, as used by
+        compile_sentence, and returns the local name holding its value.
+        `index` maps symbol names to model bits and `temps` maps sentences
+        already computed to their locals.
+        """
+        raise Exception("nothing to lower")
+
+    def temp(self, lines, temps, expression):
+        """Appends an assignment of a new local and records it in temps."""
+        name = f"t{len(temps)}"
+        lines.append(f"{name} = {expression}")
+        temps[self] = name
+        return name
 
     @classmethod
     def validate(cls, sentence):
@@ -44,14 +139,11 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
-
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+    __slots__ = ("name",)
+    fields = ("name",)
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __new__(cls, name):
+        return cls.intern(name)
 
     def __repr__(self):
         return self.name
@@ -65,20 +157,28 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
+    @cached
     def symbols(self):
-        return {self.name}
+        return frozenset((self.name,))
+
+    def lower(self, index, lines, temps):
+        if self in temps:
+            return temps[self]
+        try:
+            bit = index[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+        return self.temp(lines, temps, f"m >> {bit} & 1")
 
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    __slots__ = ("operand",)
+    fields = ("operand",)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls.intern(operand)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +186,32 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    @cached
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
     def symbols(self):
         return self.operand.symbols()
 
+    def lower(self, index, lines, temps):
+        if self in temps:
+            return temps[self]
+        operand = self.operand.lower(index, lines, temps)
+        return self.temp(lines, temps, f"{operand} ^ full")
+
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+
+    __slots__ = ("conjuncts",)
+    fields = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
+        return cls.intern(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+    def __reduce__(self):
+        return (And, self.conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,35 +220,51 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        """Sentences are immutable; use with_conjunct instead."""
+        raise TypeError(
+            "sentences are immutable: use "
+            "knowledge = knowledge.with_conjunct(sentence) instead of "
+            "knowledge.add(sentence)"
+        )
+
+    def with_conjunct(self, conjunct):
+        """Returns the conjunction with one more conjunct."""
+        return And(*self.conjuncts, conjunct)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    @cached
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
+    @cached
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return union_symbols(self.conjuncts)
+
+    def lower(self, index, lines, temps):
+        if self in temps:
+            return temps[self]
+        operands = [conjunct.lower(index, lines, temps)
+                    for conjunct in self.conjuncts]
+        return self.temp(lines, temps, " & ".join(operands) or "full")
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+
+    __slots__ = ("disjuncts",)
+    fields = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+        return cls.intern(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    def __reduce__(self):
+        return (Or, self.disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,30 +273,34 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    @cached
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
+    @cached
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return union_symbols(self.disjuncts)
+
+    def lower(self, index, lines, temps):
+        if self in temps:
+            return temps[self]
+        operands = [disjunct.lower(index, lines, temps)
+                    for disjunct in self.disjuncts]
+        return self.temp(lines, temps, " | ".join(operands) or "0")
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
-        Sentence.validate(antecedent)
-        Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+    __slots__ = ("antecedent", "consequent")
+    fields = ("antecedent", "consequent")
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def __new__(cls, antecedent, consequent):
+        Sentence.validate(antecedent)
+        Sentence.validate(consequent)
+        return cls.intern(antecedent, consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,81 +309,239 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    @cached
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
+    @cached
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        return union_symbols((self.antecedent, self.consequent))
+
+    def lower(self, index, lines, temps):
+        if self in temps:
+            return temps[self]
+        antecedent = self.antecedent.lower(index, lines, temps)
+        consequent = self.consequent.lower(index, lines, temps)
+        return self.temp(lines, temps,
+                         f"({antecedent} ^ full) | {consequent}")
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
-        Sentence.validate(left)
-        Sentence.validate(right)
-        self.left = left
-        self.right = right
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+    __slots__ = ("left", "right")
+    fields = ("left", "right")
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def __new__(cls, left, right):
+        Sentence.validate(left)
+        Sentence.validate(right)
+        return cls.intern(left, right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        return self.left.evaluate(model) == self.right.evaluate(model)
 
+    @cached
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
+    @cached
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+        return union_symbols((self.left, self.right))
+
+    def lower(self, index, lines, temps):
+        if self in temps:
+            return temps[self]
+        left = self.left.lower(index, lines, temps)
+        right = self.right.lower(index, lines, temps)
+        return self.temp(lines, temps, f"{left} ^ {right} ^ full")
+
+
+def compile_sentence(sentence, symbols, block=0):
+    """
+    Compiles a sentence into a function of a bit-packed model: bit i of its
+    int argument is the truth value of symbols[i], and it returns 1 if the
+    sentence is true in that model, 0 otherwise.
+
+    The function is straight-line Python with one bitwise operation per
+    distinct subformula, so evaluating it walks no objects and looks up no
+    names. A conjunction returns once its conjuncts so far are false.
+
+    With `block` > 0, the function instead evaluates the 2 ** block models
+    starting at model m, whose first `block` symbols take every combination
+    of values, all at once. It is called as f(m, full, patterns) with
+    `full` and `patterns` from block_patterns(block), and returns an int
+    whose bit j is the value in model m + j.
+
+    Compiled functions are cached, so checking many queries against one
+    knowledge base compiles it once.
+    """
+    return _compile(sentence, tuple(symbols), block)
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(sentence, symbols, block):
+    """Compiles a sentence for compile_sentence."""
+    index = {name: i for i, name in enumerate(symbols)}
+    lines = []
+    temps = {}
+    if block:
+        # Load each symbol's values across the block: a fixed pattern for
+        # the symbols varying within it, all ones or zeros for the others
+        for i, name in enumerate(symbols):
+            if i < block:
+                expression = f"patterns[{i}]"
+            else:
+                expression = f"-(m >> {i} & 1) & full"
+            Symbol(name).temp(lines, temps, expression)
+    if isinstance(sentence, And) and sentence.conjuncts:
+        # Return as soon as the conjuncts so far are false in every model
+        lines.append("r = full")
+        for conjunct in sentence.conjuncts:
+            value = conjunct.lower(index, lines, temps)
+            lines.append(f"r &= {value}")
+            lines.append("if not r: return 0")
+        result = "r"
+    else:
+        result = sentence.lower(index, lines, temps)
+    source = "def evaluate(m, full=1, patterns=()):\n"
+    for line in lines:
+        source += f"    {line}\n"
+    source += f"    return {result}\n"
+    namespace = {}
+    exec(source, namespace)
+    return namespace["evaluate"]
+
+
+def block_patterns(block):
+    """
+    Returns (full, patterns) for blocks of 2 ** block models: full has a
+    bit set per model, and patterns[i] has bit j set when symbol i is true
+    in model j.
+    """
+    size = 2 ** block
+    full = (1 << size) - 1
+    patterns = []
+    for i in range(block):
+        period = 2 ** (i + 1)
+        # 2 ** i false models then 2 ** i true ones, repeated
+        ones = ((1 << 2 ** i) - 1) << 2 ** i
+        patterns.append(ones * (full // ((1 << period) - 1)))
+    return full, tuple(patterns)
 
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
-
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
-
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    symbols = sorted(knowledge.symbols() | query.symbols())
+
+    # Compile both to evaluate a block of models per call, one bit each
+    block = min(len(symbols), BLOCK_BITS)
+    full, patterns = block_patterns(block)
+    knowledge = compile_sentence(knowledge, symbols, block)
+    query = compile_sentence(query, symbols, block)
+
+    # Check that in every model where knowledge is true, query is also true
+    for model in range(0, 2 ** len(symbols), 2 ** block):
+        if knowledge(model, full, patterns) & ~query(model, full, patterns):
+            return False
+    return True
+
+
+def sat_check(knowledge, query):
+    """
+    Checks if knowledge base entails query by proving knowledge ∧ ¬query
+    unsatisfiable with a CDCL SAT solver, which scales to far more symbols
+    than model_check.
+    """
+
+    return KnowledgeBase(knowledge).entails(query)
+
+
+def entails(knowledge, query, backend="sat"):
+    """
+    Checks if knowledge base entails query with the named backend:
+    "model_check" enumerates every model, "sat" uses a SAT solver.
+    """
+    try:
+        check = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"unknown backend: {backend}")
+    return check(knowledge, query)
+
+
+# Entailment backends by name
+BACKENDS = {
+    "model_check": model_check,
+    "sat": sat_check,
+}
+
+
+class KnowledgeBase():
+    """
+    Knowledge base that accepts sentences incrementally and answers many
+    entailment queries against one SAT solver. Clauses, level-0
+    propagation and learned clauses are kept between queries, and a model
+    found while answering one query refutes every later query that is
+    false in it without solving again.
+    """
+
+    def __init__(self, *sentences):
+        # Imported here since sat.py builds on this module
+        import sat
+
+        self.solver = sat.Solver()
+        self.encoder = sat.Encoder(self.solver)
+        self.sentences = []
+        # Last model of the knowledge, and the assumption literals it has
+        self.model = None
+        self.model_assumptions = ()
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        self.encoder.add(sentence)
+        self.sentences.append(sentence)
+        self.model = None
+
+    def satisfiable(self, assumptions=()):
+        """
+        Checks if the knowledge base is consistent with every sentence in
+        `assumptions` being true.
+        """
+        literals = [self.encoder.literal(assumption)
+                    for assumption in assumptions]
+        if self.solver.solve(literals):
+            self.model = self.solver.model
+            self.model_assumptions = tuple(literals)
+            return True
+        return False
+
+    def entails(self, query, assumptions=()):
+        """
+        Checks if the knowledge base entails query, with every sentence in
+        `assumptions` temporarily taken as true.
+        """
+        literals = [self.encoder.literal(assumption)
+                    for assumption in assumptions]
+        literal = self.encoder.literal(query)
+
+        # A known model of the knowledge and assumptions where the query
+        # is false shows it is not entailed
+        if (self.model is not None
+                and self.model_assumptions == tuple(literals)
+                and self.model.get(abs(literal)) == (literal < 0)):
+            return False
+
+        if self.solver.solve(literals + [-literal]):
+            self.model = self.solver.model
+            self.model_assumptions = tuple(literals)
+            return False
+        return True
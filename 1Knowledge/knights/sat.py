@@ -0,0 +1,435 @@
+"""
+CDCL SAT solver and CNF encoding of logic.Sentence trees.
+
+Encoder turns sentences into clauses with the Tseitin transformation: every
+compound subformula gets a fresh variable constrained to be equivalent to
+it, so the CNF grows linearly with the sentence instead of exponentially.
+Solver decides satisfiability with conflict-driven clause learning: unit
+propagation over two watched literals per clause, first-UIP conflict
+analysis with non-chronological backjumping, activity-ordered decisions
+with phase saving, and Luby restarts.
+
+Literals are non-zero ints as in DIMACS: variable v is the literal v and its
+negation -v.
+"""
+
+import heapq
+
+from logic import Sentence, Symbol, Not, And, Or, Implication, Biconditional
+
+# Conflicts in one unit of the Luby restart sequence
+RESTART_BASE = 100
+
+# Factor the activity increment grows by after each conflict
+ACTIVITY_DECAY = 0.95
+
+
+def luby(i):
+    """
+    Returns the i-th term (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2,
+    4, ...
+    """
+    while True:
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+class Solver():
+
+    def __init__(self):
+        """
+        Initialize a solver without variables or clauses.
+        """
+        self.count = 0
+        self.clauses = []
+        self.learned = []
+        # Clauses watching each literal, indexed by _index(literal)
+        self.watches = [[], []]
+        # Per variable: value, decision level, implying clause, activity
+        # and the value it last had
+        self.values = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [False]
+        self.heap = []
+        self.increment = 1.0
+        # Assigned literals in order, the trail length at the start of each
+        # decision level, and the next trail entry to propagate
+        self.trail = []
+        self.trail_limits = []
+        self.head = 0
+        self.unsatisfiable = False
+        self.model = {}
+
+    def new_variable(self):
+        """
+        Returns a fresh variable.
+        """
+        self.count += 1
+        self.watches.append([])
+        self.watches.append([])
+        self.values.append(None)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phases.append(False)
+        heapq.heappush(self.heap, (0.0, self.count))
+        return self.count
+
+    def add_clause(self, literals):
+        """
+        Adds a clause, a disjunction of literals. Returns False if the
+        clauses have become unsatisfiable.
+        """
+        if self.trail_limits:
+            self._cancel(0)
+        clause = []
+        for literal in literals:
+            while abs(literal) > self.count:
+                self.new_variable()
+            value = self._value(literal)
+            if value is True or -literal in clause:
+                # Satisfied at level 0, or a tautology
+                return not self.unsatisfiable
+            if value is None and literal not in clause:
+                clause.append(literal)
+
+        if not clause:
+            self.unsatisfiable = True
+        elif len(clause) == 1:
+            self._assign(clause[0], None)
+            if self._propagate() is not None:
+                self.unsatisfiable = True
+        else:
+            self._watch(clause)
+            self.clauses.append(clause)
+        return not self.unsatisfiable
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every literal in
+        `assumptions` true, storing a satisfying assignment in `model` as a
+        dict from variable to bool. Clauses learned along the way follow
+        from the clauses alone, so they are kept for later calls.
+        """
+        self.model = {}
+        if self.unsatisfiable:
+            return False
+        for literal in assumptions:
+            while abs(literal) > self.count:
+                self.new_variable()
+
+        conflicts = 0
+        restarts = 1
+        limit = RESTART_BASE * luby(restarts)
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                if not self.trail_limits:
+                    self.unsatisfiable = True
+                    return False
+                learned, level = self._analyze(conflict)
+                self._cancel(level)
+                if len(learned) == 1:
+                    self._assign(learned[0], None)
+                else:
+                    self._watch(learned)
+                    self.learned.append(learned)
+                    self._assign(learned[0], learned)
+                self.increment /= ACTIVITY_DECAY
+                conflicts += 1
+                continue
+
+            if conflicts >= limit:
+                self._cancel(0)
+                conflicts = 0
+                restarts += 1
+                limit = RESTART_BASE * luby(restarts)
+                continue
+
+            level = len(self.trail_limits)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                value = self._value(literal)
+                if value is False:
+                    self._cancel(0)
+                    return False
+                self.trail_limits.append(len(self.trail))
+                if value is None:
+                    self._assign(literal, None)
+                continue
+
+            variable = self._pick()
+            if variable is None:
+                self.model = {
+                    variable: self.values[variable]
+                    for variable in range(1, self.count + 1)
+                }
+                self._cancel(0)
+                return True
+            self.trail_limits.append(len(self.trail))
+            self._assign(variable if self.phases[variable] else -variable,
+                         None)
+
+    def _index(self, literal):
+        """
+        Returns the watch list index of a literal.
+        """
+        return 2 * literal if literal > 0 else -2 * literal + 1
+
+    def _value(self, literal):
+        """
+        Returns True or False if the literal is assigned, None otherwise.
+        """
+        value = self.values[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def _watch(self, clause):
+        """
+        Watches the first two literals of a clause.
+        """
+        self.watches[self._index(clause[0])].append(clause)
+        self.watches[self._index(clause[1])].append(clause)
+
+    def _assign(self, literal, reason):
+        """
+        Makes a literal true at the current decision level.
+        """
+        variable = abs(literal)
+        self.values[variable] = literal > 0
+        self.levels[variable] = len(self.trail_limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def _propagate(self):
+        """
+        Assigns every literal forced by unit clauses, returning a clause
+        whose literals are all false, or None if there is no conflict.
+        """
+        values = self.values
+        watches = self.watches
+        trail = self.trail
+        while self.head < len(trail):
+            false = -trail[self.head]
+            self.head += 1
+            watchers = watches[self._index(false)]
+            i = j = 0
+            while i < len(watchers):
+                clause = watchers[i]
+                i += 1
+                # Keep the false literal second
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                value = values[abs(first)]
+                if value is not None and value == (first > 0):
+                    watchers[j] = clause
+                    j += 1
+                    continue
+
+                # Look for another literal that is not false to watch
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    value = values[abs(literal)]
+                    if value is None or value == (literal > 0):
+                        clause[1], clause[k] = literal, false
+                        watches[self._index(literal)].append(clause)
+                        break
+                else:
+                    watchers[j] = clause
+                    j += 1
+                    if values[abs(first)] is not None:
+                        # Every literal is false
+                        while i < len(watchers):
+                            watchers[j] = watchers[i]
+                            i += 1
+                            j += 1
+                        del watchers[j:]
+                        return clause
+                    self._assign(first, clause)
+            del watchers[j:]
+        return None
+
+    def _analyze(self, conflict):
+        """
+        Resolves a conflict back to its first unique implication point,
+        returning the learned clause, asserting literal first, and the
+        level to backjump to.
+        """
+        level = len(self.trail_limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for literal in clause:
+                variable = abs(literal)
+                if variable in seen or self.levels[variable] == 0:
+                    continue
+                seen.add(variable)
+                self._bump(variable)
+                if self.levels[variable] == level:
+                    pending += 1
+                else:
+                    learned.append(literal)
+
+            # Resolve on the latest assigned literal of this level
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(literal)]
+
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+        # Watch the literal of the highest remaining level second
+        second = max(range(1, len(learned)),
+                     key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[second] = learned[second], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def _bump(self, variable):
+        """
+        Raises the activity of a variable involved in a conflict.
+        """
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            # Rescale before the activities overflow
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[v], v)
+                         for v in range(1, self.count + 1)
+                         if self.values[v] is None]
+            heapq.heapify(self.heap)
+        elif self.values[variable] is None:
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+
+    def _pick(self):
+        """
+        Returns the unassigned variable of highest activity, or None if
+        every variable is assigned.
+        """
+        heap = self.heap
+        while heap:
+            activity, variable = heapq.heappop(heap)
+            if (self.values[variable] is None
+                    and -activity == self.activity[variable]):
+                return variable
+        return None
+
+    def _cancel(self, level):
+        """
+        Undoes every assignment above a decision level.
+        """
+        if len(self.trail_limits) <= level:
+            return
+        limit = self.trail_limits[level]
+        for literal in self.trail[limit:]:
+            variable = abs(literal)
+            self.phases[variable] = self.values[variable]
+            self.values[variable] = None
+            self.reasons[variable] = None
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[limit:]
+        del self.trail_limits[level:]
+        self.head = limit
+
+
+class Encoder():
+
+    def __init__(self, solver):
+        """
+        Initialize an encoder adding clauses to `solver`.
+        """
+        self.solver = solver
+        # Maps symbol names to variables, and sentences to literals
+        self.variables = {}
+        self.literals = {}
+
+    def variable(self, name):
+        """
+        Returns the variable of the symbol called `name`.
+        """
+        variable = self.variables.get(name)
+        if variable is None:
+            variable = self.solver.new_variable()
+            self.variables[name] = variable
+        return variable
+
+    def add(self, sentence):
+        """
+        Asserts that a sentence is true. Conjunctions and disjunctions at
+        the top are added as clauses directly, without new variables.
+        """
+        Sentence.validate(sentence)
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.solver.add_clause(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        else:
+            self.solver.add_clause([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to a sentence, adding the clauses that
+        define it the first time the sentence is seen.
+        """
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+
+        literal = self.literals.get(sentence)
+        if literal is not None:
+            return literal
+
+        add_clause = self.solver.add_clause
+        if isinstance(sentence, And):
+            parts = [self.literal(conjunct)
+                     for conjunct in sentence.conjuncts]
+            literal = self.solver.new_variable()
+            for part in parts:
+                add_clause([-literal, part])
+            add_clause([literal] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            parts = [self.literal(disjunct)
+                     for disjunct in sentence.disjuncts]
+            literal = self.solver.new_variable()
+            for part in parts:
+                add_clause([literal, -part])
+            add_clause([-literal] + parts)
+        elif isinstance(sentence, Implication):
+            antecedent = self.literal(sentence.antecedent)
+            consequent = self.literal(sentence.consequent)
+            literal = self.solver.new_variable()
+            add_clause([-literal, -antecedent, consequent])
+            add_clause([literal, antecedent])
+            add_clause([literal, -consequent])
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            literal = self.solver.new_variable()
+            add_clause([-literal, -left, right])
+            add_clause([-literal, left, -right])
+            add_clause([literal, left, right])
+            add_clause([literal, -left, -right])
+        else:
+            raise TypeError(f"cannot encode {sentence!r}")
+
+        self.literals[sentence] = literal
+        return literal